@@ -1,8 +1,9 @@
 from django.contrib import admin
 
-from .models import Post, Location, Category, Comment
+from .models import Post, Location, Category, Comment, Job
 
 admin.site.register(Post)
 admin.site.register(Location)
 admin.site.register(Category)
 admin.site.register(Comment)
+admin.site.register(Job)
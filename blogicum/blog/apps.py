@@ -1,7 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+
+        post_migrate.connect(create_search_index, sender=self)
+
+
+def create_search_index(using, **kwargs):
+    from django.db import connections
+
+    from .search import ensure_search_index
+    ensure_search_index(connections[using])
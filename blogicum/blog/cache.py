@@ -0,0 +1,254 @@
+import json
+import re
+from hashlib import md5
+from math import ceil
+from uuid import uuid4
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+# Общая область: то, что выводится в карточках всех лент
+# (категории, местоположения).
+GLOBAL_SCOPE = 'all'
+INDEX_SCOPE = 'index'
+# Справочники категорий и местоположений (blog.lookups).
+LOOKUPS_SCOPE = 'lookups'
+PAGE_CACHE_HITS = 'blog:page-cache:hits'
+PAGE_CACHE_MISSES = 'blog:page-cache:misses'
+HOLE_RE = re.compile(r'<!--blog-hole:([A-Za-z0-9_-]+)-->')
+# Валидаторы зависят от посетителя (ConditionalGetMixin ставит их на
+# каждый ответ), поэтому в общую для всех страницу они не попадают.
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def category_scope(category_id):
+    return f'category:{category_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def post_scopes(post):
+    """Области кеша, содержимое которых зависит от публикации."""
+    return [
+        INDEX_SCOPE,
+        category_scope(post.category_id),
+        author_scope(post.author_id),
+        post_scope(post.pk),
+    ]
+
+
+def _version_key(scope):
+    return f'blog:version:{scope}'
+
+
+def get_version(scope):
+    """Текущая версия области; появляется при первом обращении.
+
+    Если кеш не сохранил ключ (DummyCache, вытеснение, недоступный
+    сервер), возвращается новая версия: это просто промах кеша.
+    """
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        token = uuid4().hex
+        cache.add(key, token, None)
+        version = cache.get(key) or token
+    return version
+
+
+def get_versions(*scopes):
+    keys = {_version_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    return ':'.join(
+        found.get(key) or get_version(scope) for key, scope in keys.items()
+    )
+
+
+def bump_versions(*scopes):
+    """Делает недействительными все ключи, собранные из версий
+    указанных областей."""
+    cache.set_many(
+        {_version_key(scope): uuid4().hex for scope in set(scopes)}, None
+    )
+
+
+def publication_window():
+    """Возвращает (границу, следующую публикацию).
+
+    Граница — момент, на который собраны ленты: публикации с pub_date
+    не позже неё уже видны. Ленты не меняются сами по себе до даты
+    ближайшей отложенной публикации (None, если таких нет), поэтому
+    граница одна для всех запросов в этом промежутке, а кеши лент
+    живут не дольше него. Окно пересчитывается и при изменении
+    публикаций или категорий.
+    """
+    now = timezone.now()
+    key = f'blog:publication-window:{get_version(INDEX_SCOPE)}'
+    window = cache.get(key)
+    if window is None or (window[1] is not None and window[1] <= now):
+        Post = apps.get_model('blog', 'Post')
+        next_publication = Post.objects.filter(
+            is_visible=True, pub_date__gt=now
+        ).aggregate(next=Min('pub_date'))['next']
+        window = (now, next_publication)
+        cache.set(key, window, _seconds_until(next_publication, now))
+    return window
+
+
+def publication_cutoff():
+    return publication_window()[0]
+
+
+def schedule_timeout(timeout):
+    """Срок жизни кеша лент: не дольше, чем до ближайшей отложенной
+    публикации."""
+    next_publication = publication_window()[1]
+    if next_publication is None:
+        return timeout
+    return min(timeout, _seconds_until(next_publication))
+
+
+def _seconds_until(moment, now=None):
+    if moment is None:
+        return None
+    seconds = (moment - (now or timezone.now())).total_seconds()
+    return max(1, ceil(seconds))
+
+
+def _schedule_token():
+    return publication_cutoff().timestamp()
+
+
+def get_or_set_for_scope(name, scope, default, timeout):
+    """Значение, вычисленное default() и действительное до смены
+    версии области scope или окна публикаций."""
+    key = f'blog:{name}:{scope}:{get_version(scope)}:{_schedule_token()}'
+    value = cache.get(key)
+    if value is None:
+        value = default()
+        cache.set(key, value, schedule_timeout(timeout))
+    return value
+
+
+def post_card_key(post):
+    """Ключ карточки меняется вместе со всем, что в ней выводится:
+    публикацией, её категорией, местоположением, именем автора и
+    числом комментариев."""
+    category, location = post.category, post.location
+    parts = (
+        post.pk, post.title, post.excerpt, post.pub_date, post.is_published,
+        post.image.name, post.image_variants, post.image_width,
+        post.image_height, post.image_placeholder, post.comment_count,
+        post.author.username,
+        category and (category.slug, category.title, category.is_published),
+        location and (location.name, location.is_published),
+    )
+    return f'blog:card:{post.pk}:{md5(repr(parts).encode()).hexdigest()}'
+
+
+def prefetch_post_cards(posts):
+    """Достаёт из кеша готовые карточки всей страницы одним запросом."""
+    keys = {post_card_key(post): post for post in posts}
+    for key, html in cache.get_many(keys).items():
+        keys[key].card_html = html
+
+
+def cache_post_card(post, html):
+    cache.set(post_card_key(post), html, settings.BLOG_POST_CARD_TIMEOUT)
+
+
+def scope_state(scope):
+    """Версии области и общей области плюс граница окна публикаций:
+    всё, от чего зависит общая для посетителей страница области."""
+    return f'{get_versions(scope, GLOBAL_SCOPE)}:{_schedule_token()}'
+
+
+def scope_last_modified(scope):
+    """Момент, когда состояние области встретилось впервые: после него
+    страницы области не менялись."""
+    return cache.get_or_set(
+        f'blog:last-modified:{scope_state(scope)}', timezone.now,
+        settings.BLOG_PAGE_CACHE_TIMEOUT
+    )
+
+
+def page_cache_key(request, scope):
+    """Ключ страницы: состояние её области и адрес с параметрами
+    (страница, курсор)."""
+    path = md5(request.get_full_path().encode()).hexdigest()
+    return f'blog:page:{scope_state(scope)}:{path}'
+
+
+def make_hole(template_name, **kwargs):
+    """Метка на месте персонального фрагмента в кешируемой странице.
+
+    Пользовательский текст на страницах экранируется, поэтому подделать
+    метку из содержимого публикаций нельзя.
+    """
+    payload = json.dumps([template_name, kwargs]).encode()
+    return f'<!--blog-hole:{urlsafe_base64_encode(payload)}-->'
+
+
+def fill_holes(response, request, context=None):
+    """Подставляет в общую для всех страницу фрагменты, отрисованные
+    для текущего пользователя."""
+    def render_hole(match):
+        template_name, kwargs = json.loads(
+            urlsafe_base64_decode(match.group(1))
+        )
+        return render_to_string(
+            template_name, {**(context or {}), **kwargs}, request
+        )
+
+    content = response.content.decode(response.charset)
+    response.content = HOLE_RE.sub(render_hole, content)
+
+
+def get_cached_page(key):
+    response = cache.get(key)
+    _incr(PAGE_CACHE_MISSES if response is None else PAGE_CACHE_HITS)
+    return response
+
+
+def cache_page_response(key, response):
+    if response.status_code != 200:
+        return
+    validators = {
+        header: response[header]
+        for header in VALIDATOR_HEADERS if response.has_header(header)
+    }
+    for header in validators:
+        del response[header]
+    cache.set(
+        key, response, schedule_timeout(settings.BLOG_PAGE_CACHE_TIMEOUT)
+    )
+    for header, value in validators.items():
+        response[header] = value
+
+
+def page_cache_stats():
+    stats = cache.get_many((PAGE_CACHE_HITS, PAGE_CACHE_MISSES))
+    return stats.get(PAGE_CACHE_HITS, 0), stats.get(PAGE_CACHE_MISSES, 0)
+
+
+def reset_page_cache_stats():
+    cache.delete_many((PAGE_CACHE_HITS, PAGE_CACHE_MISSES))
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Error, Tags, Warning, register
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Кеши блога сбрасываются сменой версий в кеше по умолчанию. Если
+    кеш живёт в памяти процесса, смена версии в одном воркере или в
+    команде (run_jobs, run_scheduler, check_visibility) не видна другим
+    процессам, и они отдают устаревшие страницы."""
+    if not isinstance(caches['default'], PROCESS_LOCAL_CACHES):
+        return []
+    level = Warning if settings.DEBUG else Error
+    return [level(
+        'Кеш по умолчанию хранится в памяти процесса.',
+        hint=(
+            'Укажите в CACHES общий для всех процессов кеш (Memcached,'
+            ' Redis или DatabaseCache), иначе сброс кешей блога не'
+            ' дойдёт до других воркеров и команд.'
+        ),
+        id='blog.E001' if level is Error else 'blog.W001',
+    )]
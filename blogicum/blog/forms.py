@@ -1,7 +1,114 @@
+from hashlib import md5
+
 from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+from django.template.loader import render_to_string
+from django.urls import reverse_lazy
+from django.utils.safestring import mark_safe
 
+from .cache import LOOKUPS_SCOPE, get_version
+from .lookups import get_table, locations
 from .models import Comment, Post, User
 
+AUTOCOMPLETE_LIMIT = 20
+
+
+class LookupChoiceIterator(ModelChoiceIterator):
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.table.all():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return (
+            len(self.field.table.snapshot())
+            + (self.field.empty_label is not None)
+        )
+
+
+class LookupChoiceField(forms.ModelChoiceField):
+    """Выбор категории или местоположения: варианты и проверка значения
+    берутся из кеша процесса, без запросов к базе."""
+    iterator = LookupChoiceIterator
+
+    def __init__(self, queryset, **kwargs):
+        self.table = get_table(queryset.model)
+        super().__init__(queryset, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        try:
+            obj = self.table.get(int(value))
+        except (TypeError, ValueError):
+            obj = None
+        if obj is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return obj
+
+
+class CachedSelect(forms.Select):
+    """Список выбора из справочника: готовый HTML кешируется до смены
+    версии справочников."""
+
+    def render(self, name, value, attrs=None, renderer=None):
+        state = (
+            name, self.format_value(value),
+            sorted({**self.attrs, **(attrs or {})}.items()),
+        )
+        key = 'blog:select:{}:{}'.format(
+            get_version(LOOKUPS_SCOPE), md5(repr(state).encode()).hexdigest()
+        )
+        html = cache.get(key)
+        if html is None:
+            html = super().render(name, value, attrs, renderer)
+            cache.set(key, html, settings.BLOG_SELECT_CACHE_TIMEOUT)
+        return mark_safe(html)
+
+
+class AutocompleteSelect(forms.Select):
+    """Список выбора, в котором выводится только выбранный вариант:
+    остальные подгружаются по первым буквам из autocomplete_url."""
+
+    def __init__(self, table, autocomplete_url, attrs=None):
+        super().__init__(attrs)
+        self.table = table
+        self.autocomplete_url = autocomplete_url
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [
+            obj for obj in (
+                self.table.get(int(pk)) for pk in value if pk.isdigit()
+            ) if obj is not None
+        ]
+        options = [
+            self.create_option(name, '', '---------', not selected, 0)
+        ] + [
+            self.create_option(name, obj.pk, str(obj), True, index)
+            for index, obj in enumerate(selected, start=1)
+        ]
+        return [(None, options, 0)]
+
+    def render(self, name, value, attrs=None, renderer=None):
+        html = super().render(name, value, attrs, renderer)
+        return mark_safe(html + render_to_string(
+            'includes/autocomplete.html', {
+                'select_id': self.build_attrs(self.attrs, attrs).get('id'),
+                'url': self.autocomplete_url,
+            }
+        ))
+
 
 class ProfileForm(forms.ModelForm):
     class Meta:
@@ -22,6 +129,14 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         exclude = ('author', 'created_at',)
+        field_classes = {
+            'category': LookupChoiceField,
+            'location': LookupChoiceField,
+        }
         widgets = {
-            'pub_date': forms.DateInput(attrs={'type': 'datetime-local'})
+            'pub_date': forms.DateInput(attrs={'type': 'datetime-local'}),
+            'category': CachedSelect,
+            'location': AutocompleteSelect(
+                locations, reverse_lazy('blog:location_autocomplete')
+            ),
         }
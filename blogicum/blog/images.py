@@ -0,0 +1,146 @@
+"""Уменьшенные копии изображений публикаций для srcset.
+
+Копии нескольких ширин в JPEG и WebP сохраняются через хранилище
+оригинала (при ContentAddressedStorage — под хешем содержимого); их
+описание хранится в Post.image_variants.
+"""
+from base64 import b64encode
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+VARIANT_WIDTHS = (320, 640, 1280)
+# Формат Pillow и расширение файла.
+FORMATS = (('JPEG', 'jpg'), ('WEBP', 'webp'))
+QUALITY = 80
+# Форматы оригиналов, которые пересохраняются без EXIF.
+RECOMPRESS = {
+    'JPEG': {'quality': 85, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 85},
+}
+VARIANTS_DIR = 'variants'
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 50
+# Метки ориентации EXIF, при которых фото поворачивается на 90°.
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+EXIF_ORIENTATION = 0x0112
+
+
+def variant_name(source_name, width, extension):
+    path = PurePosixPath(source_name)
+    return str(
+        path.parent / VARIANTS_DIR / f'{path.stem}-{width}w.{extension}'
+    )
+
+
+def _open(image, draft_size=None):
+    image.open('rb')
+    try:
+        picture = Image.open(image)
+        if draft_size:
+            # JPEG декодируется сразу в уменьшенном масштабе.
+            picture.draft('RGB', draft_size)
+        picture.load()
+    finally:
+        image.close()
+    return picture
+
+
+def recompress(image):
+    """Пересохраняет оригинал без EXIF (геометки, модель камеры),
+    повернув его по метке ориентации. Результат ложится в новый файл,
+    чтобы уже выданные ссылки на оригинал не ломались; возвращается его
+    имя или прежнее, если формат не пересжимается."""
+    picture = _open(image)
+    options = RECOMPRESS.get(picture.format)
+    if options is None:
+        return image.name
+    image_format = picture.format
+    icc_profile = picture.info.get('icc_profile')
+    picture = ImageOps.exif_transpose(picture)
+    buffer = BytesIO()
+    picture.save(buffer, image_format, icc_profile=icc_profile, **options)
+    return image.storage.save(image.name, ContentFile(buffer.getvalue()))
+
+
+def _load(image, draft_size=None):
+    """Оригинал как RGB с учётом поворота из EXIF; прозрачность
+    заливается белым, т. к. JPEG её не поддерживает."""
+    picture = ImageOps.exif_transpose(_open(image, draft_size))
+    if picture.mode in ('RGBA', 'LA', 'P'):
+        picture = picture.convert('RGBA')
+        background = Image.new('RGB', picture.size, 'white')
+        background.paste(picture, mask=picture.getchannel('A'))
+        return background
+    return picture.convert('RGB')
+
+
+def make_variants(image):
+    """Создаёт копии изображения (FieldFile) и возвращает их описание:
+    имя и размеры оригинала и список копий с шириной, высотой и
+    форматом. Копии шире оригинала не создаются."""
+    picture = _load(image)
+    width, height = picture.size
+    widths = sorted({
+        *(w for w in VARIANT_WIDTHS if w < width),
+        min(width, VARIANT_WIDTHS[-1]),
+    })
+    variants = []
+    for variant_width in widths:
+        variant_height = max(1, round(height * variant_width / width))
+        resized = picture if variant_width == width else picture.resize(
+            (variant_width, variant_height), Image.Resampling.LANCZOS
+        )
+        for image_format, extension in FORMATS:
+            buffer = BytesIO()
+            resized.save(buffer, image_format, quality=QUALITY)
+            name = image.storage.save(
+                variant_name(image.name, variant_width, extension),
+                ContentFile(buffer.getvalue()),
+            )
+            variants.append({
+                'name': name,
+                'width': variant_width,
+                'height': variant_height,
+                'format': image_format.lower(),
+            })
+    return {
+        'source': image.name,
+        'width': width,
+        'height': height,
+        'variants': variants,
+    }
+
+
+def make_preview(image):
+    """Размеры фото с учётом поворота из EXIF и крошечная копия в виде
+    data: URI (несколько сотен байт), которую страница показывает, пока
+    загружается само фото."""
+    image.open('rb')
+    try:
+        picture = Image.open(image)
+        width, height = picture.size
+        orientation = picture.getexif().get(EXIF_ORIENTATION)
+    finally:
+        image.close()
+    if orientation in TRANSPOSED_ORIENTATIONS:
+        width, height = height, width
+    picture = _load(image, draft_size=(PLACEHOLDER_SIZE * 8,) * 2)
+    picture.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = BytesIO()
+    picture.save(buffer, 'JPEG', quality=PLACEHOLDER_QUALITY)
+    placeholder = 'data:image/jpeg;base64,' + b64encode(
+        buffer.getvalue()
+    ).decode('ascii')
+    return width, height, placeholder
+
+
+def delete_variants(storage, image_variants, keep=()):
+    """Удаляет файлы копий, кроме имён из keep: одинаковые копии
+    получают одно имя, и новые копии могут совпасть со старыми."""
+    for variant in image_variants.get('variants', ()):
+        if variant['name'] not in keep:
+            storage.delete(variant['name'])
@@ -0,0 +1,114 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача ставится через Job.objects.enqueue() и выполняется командой
+run_jobs. Воркер захватывает задачу условным UPDATE, поэтому несколько
+воркеров не возьмут одну задачу дважды; задача, воркер которой
+упал, снова становится доступной после locked_until. Неудачные
+попытки повторяются с растущей паузой. Обработчики идемпотентны:
+повторное выполнение уже сделанной задачи ничего не меняет.
+"""
+import traceback
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import bump_versions, post_scopes
+from .images import make_preview, make_variants, recompress
+from .models import Job, Post
+
+LOCK_TIMEOUT = timedelta(minutes=10)
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+@handler('post_image')
+def process_post_image(post_id, image_name):
+    """Пересжимает фото публикации без EXIF, создаёт уменьшенные копии
+    и превью, запоминает размеры. Ничего не делает, если фото уже
+    обработано или заменено."""
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'image', 'image_variants', 'category_id', 'author_id'
+    ).first()
+    if post is None or post.image.name != image_name:
+        return
+    if post.image_variants.get('source') == image_name:
+        return
+    post.image.name = recompress(post.image)
+    image_variants = make_variants(post.image)
+    width, height, placeholder = make_preview(post.image)
+    Post.objects.filter(pk=post_id, image=image_name).update(
+        image=post.image.name,
+        image_variants=image_variants,
+        image_width=width,
+        image_height=height,
+        image_placeholder=placeholder,
+        updated_at=timezone.now(),
+    )
+    bump_versions(*post_scopes(post))
+
+
+def claim_jobs(limit):
+    """Захватывает до limit задач, готовых к выполнению, и возвращает
+    их id. Зависшая задача, которая уже исчерпала попытки (обработчик
+    каждый раз ронял воркер), отмечается ошибкой, а не запускается
+    снова."""
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        Q(status=Job.PENDING, run_after__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now)
+    ).order_by('run_after', 'pk').values_list('pk', 'status', 'attempts')
+    claimed = []
+    for pk, status, attempts in candidates[:limit]:
+        job = Job.objects.filter(pk=pk, status=status, attempts=attempts)
+        if status == Job.RUNNING and attempts >= MAX_ATTEMPTS:
+            job.update(
+                status=Job.FAILED,
+                locked_until=None,
+                error='Воркер не завершил задачу за отведённое время.',
+            )
+            continue
+        if job.update(
+            status=Job.RUNNING,
+            attempts=attempts + 1,
+            locked_until=now + LOCK_TIMEOUT,
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def execute(job_id):
+    """Выполняет захваченную задачу; возвращает текст ошибки или None.
+    Вызывается и в процессах пула, поэтому ничего не пишет в Job."""
+    job = Job.objects.get(pk=job_id)
+    try:
+        HANDLERS[job.kind](**job.payload)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def finish(job_id, error):
+    """Отмечает результат: успех, повтор позже или окончательная
+    ошибка после MAX_ATTEMPTS попыток."""
+    job = Job.objects.get(pk=job_id)
+    job.locked_until = None
+    job.error = error or ''
+    if error is None:
+        job.status = Job.DONE
+    elif job.attempts >= MAX_ATTEMPTS:
+        job.status = Job.FAILED
+    else:
+        job.status = Job.PENDING
+        job.run_after = timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1)
+    job.save()
+    return job.status
@@ -0,0 +1,92 @@
+"""Копии маленьких справочников (категории, местоположения) в памяти
+процесса.
+
+Актуальность копии сверяется с версией справочников LOOKUPS_SCOPE:
+сигналы меняют её при любом изменении категорий и местоположений, и
+каждый процесс перечитывает таблицу при следующем обращении. Для этого
+кеш по умолчанию должен быть общим для всех процессов (blog.checks).
+На случай пропущенной смены версии копия живёт не дольше
+BLOG_LOOKUP_TIMEOUT секунд.
+Объекты из копии общие для всех запросов процесса, их нельзя изменять.
+"""
+import time
+from bisect import bisect_left
+
+from django.apps import apps
+from django.conf import settings
+
+from .cache import LOOKUPS_SCOPE, get_version
+
+_tables = {}
+
+
+class LookupTable:
+
+    def __init__(self, model_label, *keys):
+        self.model_label = model_label
+        self.keys = keys
+        self._state = (None, 0, None)
+        _tables[model_label.lower()] = self
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def snapshot(self):
+        """Словарь {pk: объект} для текущей версии таблицы."""
+        return self._rows()['pk']
+
+    def _rows(self):
+        version = get_version(LOOKUPS_SCOPE)
+        now = time.monotonic()
+        loaded_version, expires, rows = self._state
+        if loaded_version != version or expires <= now:
+            objects = list(self.model.objects.order_by('pk'))
+            rows = {'pk': {obj.pk: obj for obj in objects}}
+            for key in self.keys:
+                rows[key] = {getattr(obj, key): obj for obj in objects}
+            self._state = (version, now + settings.BLOG_LOOKUP_TIMEOUT, rows)
+        return rows
+
+    def get(self, pk):
+        return self.snapshot().get(pk)
+
+    def get_by(self, key, value):
+        return self._rows()[key].get(value)
+
+    def all(self):
+        return list(self.snapshot().values())
+
+    def search_prefix(self, key, prefix, limit):
+        """Объекты, у которых значение key начинается с prefix без учёта
+        регистра, по алфавиту; не больше limit. Отсортированный список
+        строится один раз на версию таблицы, поиск — двоичный."""
+        rows = self._rows()
+        index = rows.get(f'sorted:{key}')
+        if index is None:
+            objects = sorted(
+                rows['pk'].values(),
+                key=lambda obj: (str(getattr(obj, key)).casefold(), obj.pk)
+            )
+            index = rows[f'sorted:{key}'] = (
+                [str(getattr(obj, key)).casefold() for obj in objects],
+                objects,
+            )
+        values, objects = index
+        prefix = prefix.casefold()
+        start = bisect_left(values, prefix)
+        results = []
+        for value, obj in zip(values[start:start + limit],
+                              objects[start:start + limit]):
+            if not value.startswith(prefix):
+                break
+            results.append(obj)
+        return results
+
+
+def get_table(model):
+    return _tables[model._meta.label_lower]
+
+
+categories = LookupTable('blog.Category', 'slug')
+locations = LookupTable('blog.Location')
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.cache import GLOBAL_SCOPE, bump_versions, post_scopes
+from blog.models import Post
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит публикации, у которых is_visible разошёлся с состоянием'
+        ' публикации и её категории, и с --fix исправляет их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько публикаций проверять за один запрос.'
+        )
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Исправить найденные расхождения.'
+        )
+
+    def handle(self, *args, batch_size, fix, **options):
+        checked = drifted = 0
+        scopes = set()
+        last_pk = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            checked += len(batch)
+            drift = list(
+                Post.objects.filter(pk__in=batch)
+                .with_visibility_drift()
+                .only('pk', 'is_visible', 'category_id', 'author_id')
+            )
+            drifted += len(drift)
+            if fix and drift:
+                with transaction.atomic():
+                    for is_visible in (True, False):
+                        Post.objects.filter(pk__in=[
+                            post.pk for post in drift
+                            if post.is_visible != is_visible
+                        ]).update(is_visible=is_visible)
+                for post in drift:
+                    scopes.update(post_scopes(post))
+        if scopes:
+            # Ленты, их счётчики и валидаторы, окно публикаций (версия
+            # INDEX_SCOPE) и страницы исправленных публикаций.
+            bump_versions(GLOBAL_SCOPE, *scopes)
+        self.stdout.write(
+            f'Проверено публикаций: {checked}, расхождений: {drifted}'
+            + (', исправлено.' if fix and drifted else '.')
+        )
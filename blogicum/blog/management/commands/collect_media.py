@@ -0,0 +1,143 @@
+import heapq
+import os
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+BATCH_SIZE = 1000
+GRACE_PERIOD = timedelta(days=1)
+# Сколько временных файлов со ссылками держать открытыми: при этом
+# числе они сливаются в один, чтобы не упереться в лимит дескрипторов.
+MERGE_FAN_IN = 64
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из каталога фото публикаций файлы, на которые не ссылается'
+        ' ни одна публикация.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько публикаций читать за один запрос; столько же'
+                 ' имён держится в памяти до сброса на диск.'
+        )
+        parser.add_argument(
+            '--grace-hours', type=float,
+            default=GRACE_PERIOD.total_seconds() / 3600,
+            help='Не трогать файлы моложе этого числа часов: на них может'
+                 ' ссылаться ещё не сохранённая форма или задача.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать файлы без ссылок, ничего не удаляя.'
+        )
+
+    def handle(self, *args, batch_size, grace_hours, dry_run, **options):
+        field = Post._meta.get_field('image')
+        storage = field.storage
+        root = field.upload_to.strip('/')
+        cutoff = time.time() - grace_hours * 3600
+        deleted = reclaimed = 0
+        with ExitStack() as stack:
+            # Ссылки собираются до обхода файлов: файл, на который
+            # сослались позже, моложе cutoff (см. ContentAddressedStorage).
+            references = self.references(batch_size, stack)
+            reference = next(references, None)
+            for name, path, size, mtime in self.walk(storage.path(root), root):
+                # Оба потока упорядочены: слияние без поиска.
+                while reference is not None and reference < name:
+                    reference = next(references, None)
+                if mtime >= cutoff or reference == name:
+                    continue
+                if not dry_run:
+                    try:
+                        if os.stat(path).st_mtime >= cutoff:
+                            continue
+                        os.remove(path)
+                    except FileNotFoundError:
+                        continue
+                deleted += 1
+                reclaimed += size
+        self.stdout.write(
+            '{verb} файлов: {deleted}, освобождено байт: {reclaimed}.'
+            .format(
+                verb='Можно удалить' if dry_run else 'Удалено',
+                deleted=deleted, reclaimed=reclaimed,
+            )
+        )
+
+    @staticmethod
+    def referenced_names(post):
+        yield post.image.name
+        for variant in post.image_variants.get('variants', ()):
+            yield variant['name']
+
+    def references(self, batch_size, stack):
+        """Все имена файлов, на которые ссылаются публикации, по
+        возрастанию. Публикации читаются пачками по pk, отсортированные
+        пачки сбрасываются во временные файлы и сливаются, так что в
+        памяти не больше batch_size публикаций, а открытых файлов — не
+        больше MERGE_FAN_IN."""
+        queryset = Post.objects.exclude(image='').only(
+            'pk', 'image', 'image_variants'
+        ).order_by('pk')
+        run_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        runs = []
+        stack.callback(lambda: [run.close() for run in runs])
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            runs.append(self.write_run(run_dir, sorted({
+                name for post in batch for name in self.referenced_names(post)
+            })))
+            if len(runs) >= MERGE_FAN_IN:
+                merged = self.write_run(
+                    run_dir, heapq.merge(*map(self.read_run, runs))
+                )
+                for run in runs:
+                    run.close()
+                    os.remove(run.name)
+                runs[:] = [merged]
+        return heapq.merge(*map(self.read_run, runs))
+
+    @staticmethod
+    def write_run(run_dir, names):
+        run = tempfile.NamedTemporaryFile(
+            'w+', encoding='utf-8', dir=run_dir, delete=False
+        )
+        run.writelines(f'{name}\n' for name in names)
+        run.seek(0)
+        return run
+
+    @staticmethod
+    def read_run(run):
+        return (line.rstrip('\n') for line in run)
+
+    def walk(self, path, name):
+        """Файлы каталога (name — путь относительно хранилища) по
+        возрастанию полных имён, без чтения всего дерева в память."""
+        try:
+            entries = list(os.scandir(path))
+        except FileNotFoundError:
+            return
+        # Каталог «ab» должен идти после файла «ab.jpg», как «ab/…».
+        entries.sort(key=lambda entry: entry.name + (
+            '/' if entry.is_dir(follow_symlinks=False) else ''
+        ))
+        for entry in entries:
+            entry_name = f'{name}/{entry.name}'
+            if entry.is_dir(follow_symlinks=False):
+                yield from self.walk(entry.path, entry_name)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                yield entry_name, entry.path, stat.st_size, stat.st_mtime
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from blog.cache import bump_versions, post_scopes
+from blog.images import make_preview
+from blog.models import Post
+
+BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры и превью фото публикаций, у которых их нет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько публикаций обрабатывать за один запрос.'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересчитать и для публикаций, где они уже есть.'
+        )
+
+    def handle(self, *args, batch_size, force, **options):
+        done = failed = 0
+        last_pk = 0
+        queryset = Post.objects.exclude(image='').only(
+            'pk', 'image', 'category_id', 'author_id'
+        )
+        if not force:
+            queryset = queryset.filter(
+                Q(image_width=None) | Q(image_height=None)
+                | Q(image_placeholder='')
+            )
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scopes = set()
+            for post in batch:
+                try:
+                    width, height, placeholder = make_preview(post.image)
+                except OSError as error:
+                    failed += 1
+                    self.stderr.write(f'{post.image.name}: {error}')
+                    continue
+                Post.objects.filter(pk=post.pk, image=post.image.name).update(
+                    image_width=width,
+                    image_height=height,
+                    image_placeholder=placeholder,
+                    updated_at=timezone.now(),
+                )
+                scopes.update(post_scopes(post))
+                done += 1
+            bump_versions(*scopes)
+        self.stdout.write(
+            f'Обработано фото: {done}, с ошибками: {failed}.'
+        )
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.cache import bump_versions, post_scopes
+from blog.images import delete_variants, make_variants
+from blog.models import Post
+
+BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии фото публикаций, у которых их нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько публикаций обрабатывать за один запрос.'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать копии и для публикаций, где они уже есть.'
+        )
+
+    def handle(self, *args, batch_size, force, **options):
+        done = failed = 0
+        last_pk = 0
+        queryset = Post.objects.exclude(image='').only(
+            'pk', 'image', 'image_variants', 'category_id', 'author_id'
+        )
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scopes = set()
+            for post in batch:
+                if (
+                    not force
+                    and post.image_variants.get('source') == post.image.name
+                ):
+                    continue
+                try:
+                    image_variants = make_variants(post.image)
+                except OSError as error:
+                    failed += 1
+                    self.stderr.write(f'{post.image.name}: {error}')
+                    continue
+                if not Post.objects.filter(
+                    pk=post.pk, image=post.image.name
+                ).update(
+                    image_variants=image_variants, updated_at=timezone.now()
+                ):
+                    # Фото заменили, пока делались копии: новые копии
+                    # без ссылок уберёт collect_media.
+                    continue
+                old_names = {
+                    variant['name']
+                    for variant in post.image_variants.get('variants', ())
+                }
+                delete_variants(
+                    post.image.storage, post.image_variants,
+                    keep=Post.objects.used_variants(old_names),
+                )
+                scopes.update(post_scopes(post))
+                done += 1
+            bump_versions(*scopes)
+        self.stdout.write(
+            f'Обработано фото: {done}, с ошибками: {failed}.'
+        )
@@ -0,0 +1,116 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.cache import bump_versions, post_scopes
+from blog.models import Job, Post
+
+BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит фото публикаций и их копии в дерево с именами по хешу'
+        ' содержимого и переписывает ссылки на них.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько публикаций обрабатывать за один запрос.'
+        )
+        parser.add_argument(
+            '--keep-old', action='store_true',
+            help='Не удалять файлы из прежнего расположения.'
+        )
+
+    def handle(self, *args, batch_size, keep_old, **options):
+        storage = Post._meta.get_field('image').storage
+        moved = failed = 0
+        last_pk = 0
+        queryset = Post.objects.exclude(image='').only(
+            'pk', 'image', 'image_variants', 'category_id', 'author_id'
+        )
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scopes = set()
+            old_names = set()
+            for post in batch:
+                try:
+                    renamed = self.move_files(storage, post)
+                except OSError as error:
+                    failed += 1
+                    self.stderr.write(f'{post.image.name}: {error}')
+                    continue
+                if renamed and self.rewrite(post, renamed):
+                    old_names.update(renamed)
+                    scopes.update(post_scopes(post))
+                    moved += 1
+            bump_versions(*scopes)
+            if not keep_old:
+                still_used = set(Post.objects.filter(
+                    image__in=old_names
+                ).values_list('image', flat=True))
+                for name in old_names - still_used:
+                    storage.delete(name)
+        self.stdout.write(
+            f'Перенесено фото: {moved}, с ошибками: {failed}.'
+        )
+
+    @staticmethod
+    def move_files(storage, post):
+        """Копирует фото и его копии по новым именам и возвращает
+        словарь {старое имя: новое} для файлов, которые ещё не в новом
+        расположении."""
+        names = [post.image.name] + [
+            variant['name']
+            for variant in post.image_variants.get('variants', ())
+        ]
+        renamed = {}
+        for name in names:
+            if storage.is_addressed(name) or name in renamed:
+                continue
+            with storage.open(name) as content:
+                renamed[name] = storage.save(name, content)
+        return renamed
+
+    def rewrite(self, post, renamed):
+        """Переписывает ссылки публикации на новые имена; False, если
+        фото заменили во время переноса (тогда старые файлы остаются,
+        а новые копии — без ссылок)."""
+        old_name = post.image.name
+        image_name = renamed.get(old_name, old_name)
+        image_variants = self.rename_variants(post.image_variants, renamed)
+        if not Post.objects.filter(pk=post.pk, image=old_name).update(
+            image=image_name,
+            image_variants=image_variants,
+            updated_at=timezone.now(),
+        ):
+            return False
+        if image_variants.get('source') != image_name:
+            # Задача для старого имени будет пропущена как устаревшая.
+            Job.objects.enqueue(
+                'post_image', f'post-image:{post.pk}:{image_name}',
+                post_id=post.pk, image_name=image_name,
+            )
+        return True
+
+    @staticmethod
+    def rename_variants(image_variants, renamed):
+        if not image_variants:
+            return image_variants
+        source = image_variants.get('source')
+        return {
+            **image_variants,
+            'source': renamed.get(source, source),
+            'variants': [
+                {**variant, 'name': renamed.get(
+                    variant['name'], variant['name']
+                )}
+                for variant in image_variants.get('variants', ())
+            ],
+        }
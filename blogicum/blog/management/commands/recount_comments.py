@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.models import Comment, Post
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики комментариев публикаций.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько публикаций проверять за один запрос.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        # Счётчик считается в том же UPDATE, что и записывается:
+        # комментарий, добавленный во время пересчёта, не теряется.
+        actual = Coalesce(Subquery(
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(count=Count('pk'))
+            .values('count')
+        ), 0)
+        checked = fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            checked += len(batch)
+            fixed += Post.objects.filter(
+                pk__gt=last_pk, pk__lte=batch[-1]
+            ).exclude(comment_count=actual).update(comment_count=actual)
+            last_pk = batch[-1]
+        self.stdout.write(
+            f'Проверено публикаций: {checked}, исправлено: {fixed}.'
+        )
@@ -0,0 +1,73 @@
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blog.jobs import claim_jobs, execute, finish
+from blog.models import Job
+
+POLL_INTERVAL = 1.0
+
+
+def init_worker():
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди (обработка фото публикаций)'
+        ' в пуле процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1,
+            help='Размер пула процессов; 0 — выполнять задачи в этом'
+                 ' же процессе.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+
+    def handle(self, *args, processes, once, poll_interval, **options):
+        pool = processes and ProcessPoolExecutor(
+            processes, initializer=init_worker
+        )
+        results = Counter()
+        try:
+            while True:
+                job_ids = claim_jobs(limit=max(processes, 1) * 2)
+                if not job_ids:
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                if pool:
+                    # Процессы пула не должны унаследовать соединение.
+                    connections.close_all()
+                    errors = pool.map(execute, job_ids)
+                else:
+                    errors = map(execute, job_ids)
+                for job_id, error in zip(job_ids, errors):
+                    results[finish(job_id, error)] += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool:
+                pool.shutdown()
+        self.stdout.write(
+            'Выполнено: {done}, отложено: {pending}, с ошибкой: {failed}.'
+            .format(
+                done=results[Job.DONE], pending=results[Job.PENDING],
+                failed=results[Job.FAILED],
+            )
+        )
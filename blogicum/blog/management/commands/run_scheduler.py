@@ -0,0 +1,105 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from blog.cache import bump_versions, post_scopes
+from blog.models import Post
+
+LAST_RUN_KEY = 'blog:scheduler:last-run'
+MAX_SLEEP = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Долгоживущий процесс: в момент наступления pub_date отложенных'
+        ' публикаций сбрасывает кеш их лент и заранее рендерит первые'
+        ' страницы главной, категории и профиля автора. Имеет смысл'
+        ' с общим для всех процессов бэкендом кеша.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать наступившие публикации и выйти.'
+        )
+        parser.add_argument(
+            '--max-sleep', type=float, default=MAX_SLEEP,
+            help='Как часто, в секундах, проверять новые отложенные'
+                 ' публикации.'
+        )
+        parser.add_argument(
+            '--pages', type=int, default=1,
+            help='Сколько первых страниц каждой ленты рендерить.'
+        )
+
+    def handle(self, *args, once, max_sleep, pages, **options):
+        since = cache.get(LAST_RUN_KEY) or timezone.now()
+        try:
+            while True:
+                now = timezone.now()
+                self.publish_due(since, now, pages)
+                since = now
+                cache.set(LAST_RUN_KEY, since, None)
+                if once:
+                    break
+                time.sleep(self.get_delay(max_sleep))
+        except KeyboardInterrupt:
+            pass
+
+    def get_delay(self, max_sleep):
+        """Сон до ближайшей отложенной публикации, но не дольше
+        max_sleep: публикации, запланированные во время сна, тоже
+        нужно заметить."""
+        next_publication = Post.objects.filter(
+            is_visible=True, pub_date__gt=timezone.now()
+        ).aggregate(next=Min('pub_date'))['next']
+        if next_publication is None:
+            return max_sleep
+        seconds = (next_publication - timezone.now()).total_seconds()
+        return min(max(seconds, 0), max_sleep)
+
+    def publish_due(self, since, now, pages):
+        due = list(Post.objects.filter(
+            is_visible=True,
+            pub_date__gt=since,
+            pub_date__lte=now,
+        ).select_related('author', 'category'))
+        if not due:
+            return
+        scopes = set()
+        urls = {reverse('blog:index')}
+        for post in due:
+            scopes.update(post_scopes(post))
+            urls.add(reverse('blog:category_posts', args=[post.category.slug]))
+            urls.add(reverse('blog:profile', args=[post.author.username]))
+        bump_versions(*scopes)
+        warmed = sum(
+            self.warm(url if number == 1 else f'{url}?page={number}')
+            for url in sorted(urls)
+            for number in range(1, pages + 1)
+        )
+        self.stdout.write(
+            f'{now:%Y-%m-%d %H:%M:%S}: опубликовано {len(due)}, '
+            f'подготовлено страниц: {warmed}.'
+        )
+
+    def warm(self, url):
+        """Рендерит страницу так же, как для анонимного посетителя,
+        чтобы она попала в кеш страниц."""
+        request = RequestFactory().get(url)
+        request.user = AnonymousUser()
+        match = resolve(request.path_info)
+        try:
+            response = match.func(request, *match.args, **match.kwargs)
+        except Http404:
+            return False
+        if hasattr(response, 'render'):
+            response.render()
+        return response.status_code == 200
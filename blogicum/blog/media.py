@@ -0,0 +1,151 @@
+"""Отдача загруженных файлов (MEDIA_URL) вместо django.conf.urls.static.
+
+Поддерживаются запросы Range, строгие ETag и Last-Modified. Файлы с
+именем по хешу содержимого не меняются, поэтому кешируются на год как
+immutable. В режиме BLOG_MEDIA_SENDFILE Django только проверяет запрос
+и выставляет заголовки, а сам файл (и Range) отдаёт прокси по
+X-Accel-Redirect или X-Sendfile.
+"""
+import mimetypes
+import os
+import re
+from pathlib import PurePosixPath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, StreamingHttpResponse
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import ContentAddressedStorage
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+SENDFILE_HEADERS = {
+    'x-accel-redirect': 'X-Accel-Redirect',
+    'x-sendfile': 'X-Sendfile',
+}
+
+
+def _etag(name, stat):
+    """Хеш из имени, если файл назван по содержимому, иначе размер и
+    время изменения с точностью до наносекунд."""
+    match = ContentAddressedStorage.ADDRESSED_RE.match(name)
+    if match:
+        return '"{}"'.format(PurePosixPath(name).stem)
+    return '"{:x}-{:x}"'.format(stat.st_mtime_ns, stat.st_size)
+
+
+def _cache_control(name):
+    if ContentAddressedStorage.ADDRESSED_RE.match(name):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={settings.BLOG_MEDIA_MAX_AGE}'
+
+
+def parse_range(header, size):
+    """(start, end) включительно для одного диапазона байтов; None —
+    отдать файл целиком (нет заголовка или несколько диапазонов);
+    ValueError — диапазон за пределами файла."""
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _read_range(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Файл не найден.')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден.')
+    name = PurePosixPath(path).as_posix()
+    etag = _etag(name, stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = _file_response(request, full_path, name, stat, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = _cache_control(name)
+    return response
+
+
+def _file_response(request, full_path, name, stat, etag):
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    sendfile = settings.BLOG_MEDIA_SENDFILE
+    if sendfile:
+        response = HttpResponse(content_type=content_type)
+        response[SENDFILE_HEADERS[sendfile]] = (
+            settings.BLOG_MEDIA_SENDFILE_PREFIX + quote(name)
+            if sendfile == 'x-accel-redirect' else full_path
+        )
+        return response
+    size = stat.st_size
+    byte_range = None
+    if _if_range_matches(request, etag, int(stat.st_mtime)):
+        try:
+            byte_range = parse_range(request.headers.get('Range', ''), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+    elif byte_range is None:
+        response = FileResponse(
+            open(full_path, 'rb'), content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(open(full_path, 'rb'), start, length),
+            status=206, content_type=content_type,
+        )
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -1,8 +1,27 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models.query import ModelIterable
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from .cache import publication_cutoff
+from .lookups import categories, locations
+from .storage import post_image_storage
 
 User = get_user_model()
 
+EXCERPT_WORDS = 10
+# Поля, которые пишет задача обработки фото.
+IMAGE_FIELDS = (
+    'image', 'image_variants', 'image_width', 'image_height',
+    'image_placeholder',
+)
+
+
+def make_excerpt(text):
+    """То же, что фильтр truncatewords в карточке публикации."""
+    return Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+
 
 class PublishedModel(models.Model):
     is_published = models.BooleanField(
@@ -58,6 +77,88 @@ class Location(PublishedModel):
         return self.name
 
 
+class LookupIterable(ModelIterable):
+    """Подставляет в публикации категорию и местоположение из кеша
+    процесса вместо JOIN или отдельных запросов."""
+
+    def __iter__(self):
+        tables = (
+            ('category', categories.snapshot()),
+            ('location', locations.snapshot()),
+        )
+        for post in super().__iter__():
+            for name, rows in tables:
+                field = post._meta.get_field(name)
+                related = rows.get(getattr(post, field.attname))
+                if related is not None:
+                    field.set_cached_value(post, related)
+            yield post
+
+
+class PostQuerySet(models.QuerySet):
+    def published(self):
+        """Публикации, которые видны всем посетителям.
+
+        Публикация и её категория проверяются по одному полю
+        is_visible, без соединения с категориями. Граница по времени
+        берётся из publication_cutoff(), а не timezone.now(): она не
+        меняется до ближайшей отложенной публикации, и запрос одинаков
+        для всех обращений.
+        """
+        return self.filter(
+            is_visible=True,
+            pub_date__lte=publication_cutoff()
+        )
+
+    def with_visibility_drift(self):
+        """Публикации, у которых is_visible не совпадает с состоянием
+        публикации и её категории."""
+        expected = models.Q(is_published=True, category__is_published=True)
+        return self.filter(
+            (expected & models.Q(is_visible=False))
+            | (~expected & models.Q(is_visible=True))
+        )
+
+    def with_lookups(self):
+        """Категория и местоположение берутся из кеша процесса."""
+        clone = self._chain()
+        clone._iterable_class = LookupIterable
+        return clone
+
+    def for_feed(self):
+        """Строки для карточек ленты: автор загружается тем же
+        запросом, категория и местоположение — из кеша процесса, число
+        комментариев и анонс хранятся в самой публикации, поэтому
+        полный текст не читается.
+
+        pk в сортировке делает порядок однозначным для пагинации
+        по курсору.
+        """
+        return self.select_related('author').with_lookups().defer(
+            'text'
+        ).order_by('-pub_date', '-pk')
+
+    def used_variants(self, names):
+        """Имена из names, на которые ссылается image_variants хотя бы
+        одной публикации: одинаковые фото хранятся одним файлом, и
+        копии у них тоже общие."""
+        names = set(names)
+        if not names:
+            return set()
+        query = models.Q()
+        for name in names:
+            query |= models.Q(image_variants__icontains=f'"{name}"')
+        used = set()
+        for image_variants in self.filter(query).values_list(
+            'image_variants', flat=True
+        ):
+            used.update(
+                variant['name']
+                for variant in image_variants.get('variants', ())
+            )
+        return used & names
+
+
 class Post(PublishedModel):
     title = models.CharField(
         max_length=256,
@@ -91,21 +192,144 @@ class Post(PublishedModel):
     image = models.ImageField(
         'Фото',
         upload_to='post_images/',
+        storage=post_image_storage,
+        width_field='image_width',
+        height_field='image_height',
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Ширина фото'
+    )
+    image_height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Высота фото'
+    )
+    image_placeholder = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Превью фото',
+        help_text='Крошечная копия фото в data: URI, видна до загрузки.'
+    )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии фото'
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
+    excerpt = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Анонс'
+    )
+    is_visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Видна в лентах',
+        help_text='Опубликована сама публикация и её категория.'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено',
+        help_text='Меняется и при изменении комментариев к публикации.'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('pub_date',),
+                condition=models.Q(is_visible=True),
+                name='post_visible_feed_idx'
+            ),
+            models.Index(
+                fields=('category', 'pub_date'),
+                condition=models.Q(is_visible=True),
+                name='post_category_visible_idx'
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='post_author_feed_idx'
+            ),
+        )
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if 'text' in self.__dict__:
+            self.excerpt = make_excerpt(self.text)
+        self.is_visible = bool(
+            self.is_published
+            and self.category_id
+            and self.category.is_published
+        )
+        adding = self._state.adding or self.pk is None
+        image_changed = adding or self.image_changed()
+        if image_changed:
+            new_image = self.prepare_image()
+        elif kwargs.get('update_fields') is None and not kwargs.get(
+            'force_insert'
+        ):
+            # Фото, его размеры, превью и копии записывает задача
+            # обработки; объект, загруженный до её окончания, не должен
+            # вернуть необработанный оригинал.
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in IMAGE_FIELDS
+                and field.attname not in deferred
+            ]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if image_changed and new_image:
+                Job.objects.enqueue(
+                    'post_image', f'post-image:{self.pk}:{self.image.name}',
+                    post_id=self.pk, image_name=self.image.name
+                )
+
+    def image_changed(self):
+        """Загружен новый файл или фото удалено."""
+        return 'image' in self.__dict__ and (
+            not self.image or not self.image._committed
+        )
+
+    def prepare_image(self):
+        """Сохраняет загруженное фото в хранилище как есть. Обработка
+        (копии, удаление EXIF) ставится в очередь в одной транзакции с
+        сохранением публикации, поэтому время запроса не зависит от
+        размера фото. Возвращает True, если фото ещё не обработано."""
+        if not self.image:
+            self.image_variants = {}
+            self.image_placeholder = ''
+            return False
+        if not self.image._committed:
+            self.image.save(self.image.name, self.image.file, save=False)
+        if self.image_variants.get('source') == self.image.name:
+            return False
+        self.image_variants = {}
+        self.image_placeholder = ''
+        return True
+
 
 class Comment(models.Model):
     text = models.TextField('Текст коментария')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -119,3 +343,102 @@ class Comment(models.Model):
         verbose_name = 'комментарий'
         verbose_name_plural = 'коментарии'
         ordering = ('created_at',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created_at'),
+                name='comment_post_created_idx'
+            ),
+        )
+
+
+class JobQuerySet(models.QuerySet):
+    def enqueue(self, kind, key, **payload):
+        """Ставит задачу в очередь. Задача с тем же ключом, которая ждёт
+        или выполняется, не дублируется; завершённая ставится заново:
+        её результат мог быть потерян (например, фото вернули)."""
+        job, created = self.get_or_create(
+            key=key, defaults={'kind': kind, 'payload': payload}
+        )
+        if not created and self.filter(
+            pk=job.pk, status__in=(Job.DONE, Job.FAILED)
+        ).update(
+            status=Job.PENDING, attempts=0, run_after=timezone.now(),
+            locked_until=None, error='',
+        ):
+            job.refresh_from_db()
+        return job
+
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    kind = models.CharField(
+        max_length=64,
+        verbose_name='Тип задачи'
+    )
+    key = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Ключ',
+        help_text='Задача с тем же ключом не ставится в очередь повторно.'
+    )
+    payload = models.JSONField(
+        default=dict,
+        verbose_name='Параметры'
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Состояние'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Не раньше'
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Захвачена до',
+        help_text='После этого момента задачу может забрать другой воркер.'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Добавлено'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено'
+    )
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = (
+            models.Index(
+                fields=('status', 'run_after'),
+                name='job_queue_idx'
+            ),
+        )
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,232 @@
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .cache import get_or_set_for_scope
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(direction, value=None, pk=None):
+    raw = direction if value is None else (
+        f'{direction}|{value.isoformat()}|{pk}'
+    )
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, значение ключа, pk) из токена."""
+    try:
+        raw = force_str(urlsafe_base64_decode(cursor))
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Некорректный курсор')
+    if raw in (NEXT, PREVIOUS):
+        return raw, None, None
+    try:
+        direction, value, pk = raw.split('|')
+        value, pk = parse_datetime(value), int(pk)
+    except ValueError:
+        raise InvalidCursor('Некорректный курсор')
+    if direction not in (NEXT, PREVIOUS) or value is None:
+        raise InvalidCursor('Некорректный курсор')
+    return direction, value, pk
+
+
+class CursorPage(Sequence):
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.paginator.cursor_for(NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self.paginator.cursor_for(PREVIOUS, self.object_list[0])
+
+
+class CursorPaginator:
+    """Пагинация по ключу (поле даты, pk) без OFFSET и COUNT.
+
+    Каждая страница — один запрос по индексу, поэтому время ответа
+    не зависит от глубины страницы.
+    """
+
+    def __init__(self, object_list, per_page, key='-pub_date'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.descending = key.startswith('-')
+        self.key = key.lstrip('-')
+
+    @property
+    def last_cursor(self):
+        return encode_cursor(PREVIOUS)
+
+    def cursor_for(self, direction, obj):
+        return encode_cursor(direction, getattr(obj, self.key), obj.pk)
+
+    def _slice(self, value, pk, towards_smaller):
+        queryset = self.object_list
+        if towards_smaller:
+            if value is not None:
+                queryset = queryset.filter(
+                    **{f'{self.key}__lte': value}
+                ).exclude(**{self.key: value, 'pk__gte': pk})
+            ordering = (f'-{self.key}', '-pk')
+        else:
+            if value is not None:
+                queryset = queryset.filter(
+                    **{f'{self.key}__gte': value}
+                ).exclude(**{self.key: value, 'pk__lte': pk})
+            ordering = (self.key, 'pk')
+        return list(queryset.order_by(*ordering)[:self.per_page + 1])
+
+    def page(self, cursor=None):
+        """Страница по токену; без токена — первая страница."""
+        if cursor is None:
+            direction, value, pk = NEXT, None, None
+        else:
+            direction, value, pk = decode_cursor(cursor)
+        forward = direction == NEXT
+        rows = self._slice(value, pk, towards_smaller=(
+            forward == self.descending
+        ))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            return CursorPage(rows, self, has_more, value is not None)
+        rows.reverse()
+        return CursorPage(rows, self, value is not None, has_more)
+
+
+class FeedPage(Page):
+    is_cursor = False
+
+    @property
+    def next_cursor(self):
+        """Курсор продолжения ленты после последней нумерованной
+        страницы."""
+        if (
+            self.has_next()
+            and self.number >= self.paginator.numbered_pages
+        ):
+            return encode_cursor(
+                NEXT, self.object_list[-1].pub_date, self.object_list[-1].pk
+            )
+
+
+class FeedPaginator(Paginator):
+    """Нумерованная пагинация только для первых max_pages страниц,
+    дальше лента листается курсором.
+
+    Число публикаций кешируется в версии области scope и считается
+    точно только до порога BLOG_FEED_COUNT_LIMIT: за порогом хватает
+    знания, что страниц больше, чем помещается в нумерацию.
+    """
+
+    def __init__(self, object_list, per_page, max_pages, scope=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.max_pages = max_pages
+        self.scope = scope
+        self.count_limit = max(
+            settings.BLOG_FEED_COUNT_LIMIT, max_pages * self.per_page + 1
+        )
+        self.count_is_estimated = False
+
+    @cached_property
+    def count(self):
+        if self.scope is None:
+            return self._count()
+        count, self.count_is_estimated = get_or_set_for_scope(
+            'count', self.scope,
+            lambda: (self._count(), self.count_is_estimated),
+            settings.BLOG_FEED_COUNT_TIMEOUT
+        )
+        return count
+
+    def _count(self):
+        count = self.object_list[:self.count_limit + 1].count()
+        if count > self.count_limit:
+            self.count_is_estimated = True
+            return self.count_limit
+        return count
+
+    @cached_property
+    def numbered_pages(self):
+        return min(self.num_pages, self.max_pages)
+
+    @property
+    def page_range(self):
+        return range(1, self.numbered_pages + 1)
+
+    def get_elided_page_range(self, number=1, *, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг текущей и по краям нумерации,
+        пропуски заменены на ELLIPSIS."""
+        last = self.numbered_pages
+        pages = {
+            *range(1, min(on_ends, last) + 1),
+            *range(max(last - on_ends + 1, 1), last + 1),
+            *range(max(number - on_each_side, 1),
+                   min(number + on_each_side, last) + 1),
+        }
+        previous = 0
+        for page in sorted(pages):
+            if page - previous == 2:
+                yield previous + 1
+            elif page - previous > 2:
+                yield self.ELLIPSIS
+            yield page
+            previous = page
+
+    @property
+    def last_cursor(self):
+        """Курсор последней страницы, если она за пределами нумерации."""
+        if self.num_pages > self.max_pages:
+            return encode_cursor(PREVIOUS)
+
+    def validate_number(self, number):
+        number = super().validate_number(number)
+        if number > self.max_pages:
+            raise EmptyPage('Дальше лента доступна только по курсору')
+        return number
+
+    def _get_page(self, *args, **kwargs):
+        page = FeedPage(*args, **kwargs)
+        page.object_list = list(page.object_list)
+        return page
@@ -0,0 +1,117 @@
+"""Полнотекстовый поиск по публикациям на SQLite FTS5.
+
+Индекс blog_post_fts хранит только токены (external content) и
+синхронизируется триггерами. SQLite пересоздаёт таблицу blog_post при
+многих миграциях и теряет триггеры, поэтому они восстанавливаются
+после каждого migrate.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .cache import publication_cutoff
+
+FTS_TABLE = 'blog_post_fts'
+MARK_START, MARK_END = '\x02', '\x03'
+
+SCHEMA = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, text, content='blog_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai
+    AFTER INSERT ON blog_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad
+    AFTER DELETE ON blog_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, text ON blog_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END""",
+)
+
+SEARCH_SQL = f"""
+    SELECT {FTS_TABLE}.rowid,
+           highlight({FTS_TABLE}, 0, %s, %s),
+           snippet({FTS_TABLE}, 1, %s, %s, '…', 24)
+    FROM {FTS_TABLE}
+    JOIN blog_post ON blog_post.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH %s
+      AND blog_post.is_visible
+      AND blog_post.pub_date <= %s
+    ORDER BY rank
+    LIMIT %s OFFSET %s
+"""
+
+
+def ensure_search_index(using=connection):
+    """Создаёт индекс и триггеры, если их нет; новый индекс
+    заполняется из blog_post."""
+    if using.vendor != 'sqlite':
+        return
+    with using.cursor() as cursor:
+        exists = FTS_TABLE in using.introspection.table_names(cursor)
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        if not exists:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+
+
+def rebuild_search_index():
+    ensure_search_index()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
+
+
+def build_match_query(query):
+    """Слова запроса как фразы FTS5, последнее — префиксом: операторы
+    FTS5 из пользовательского ввода не интерпретируются."""
+    words = re.findall(r'\w+', query)
+    if not words:
+        return ''
+    phrases = [f'"{word}"' for word in words]
+    phrases[-1] += '*'
+    return ' '.join(phrases)
+
+
+def _highlighted(text):
+    return mark_safe(
+        escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    )
+
+
+def search_posts(query, limit, offset=0):
+    """Возвращает [(id, заголовок, фрагмент)] опубликованных публикаций
+    по убыванию релевантности; заголовок и фрагмент — безопасный HTML
+    с подсветкой совпадений."""
+    match = build_match_query(query)
+    if not match:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(SEARCH_SQL, [
+            MARK_START, MARK_END, MARK_START, MARK_END,
+            match,
+            connection.ops.adapt_datetimefield_value(publication_cutoff()),
+            limit, offset,
+        ])
+        return [
+            (pk, _highlighted(title), _highlighted(snippet))
+            for pk, title, snippet in cursor.fetchall()
+        ]
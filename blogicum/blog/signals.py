@@ -0,0 +1,199 @@
+from threading import local
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import (
+    GLOBAL_SCOPE, INDEX_SCOPE, LOOKUPS_SCOPE, author_scope, bump_versions,
+    category_scope, post_scopes
+)
+from .images import delete_variants
+from .models import Category, Comment, Location, Post, User
+
+# Публикации и пользователи, которые сейчас удаляются в этом потоке:
+# их комментарии удаляются каскадом и учитываются одним запросом, а не
+# по одному на комментарий.
+_deleting = local()
+
+# ImageField читает файл при загрузке каждой публикации с пустыми
+# размерами (и падает, если файла нет). Размеры обновляются при
+# присваивании нового фото, старые записи заполняет fill_image_previews.
+post_init.disconnect(
+    Post._meta.get_field('image').update_dimension_fields, sender=Post
+)
+
+
+def _touch_post(post_id, comment_delta=0):
+    """Комментарии — часть страницы публикации, поэтому их изменение
+    меняет и updated_at публикации."""
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F('comment_count') + comment_delta,
+        updated_at=timezone.now()
+    )
+
+
+def _bump_versions(*scopes):
+    """Версии меняются сразу и ещё раз после фиксации транзакции:
+    страница, которую параллельный запрос собрал в этом промежутке из
+    прежних строк, тоже перестаёт находиться."""
+    bump_versions(*scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_versions(*scopes))
+
+
+def _deleting_ids(name):
+    ids = getattr(_deleting, name, None)
+    if ids is None:
+        ids = set()
+        setattr(_deleting, name, ids)
+    return ids
+
+
+def _bump_comment_post(comment):
+    post = Post.objects.filter(pk=comment.post_id).only(
+        'category_id', 'author_id'
+    ).first()
+    if post is not None:
+        _bump_versions(*post_scopes(post))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    _touch_post(instance.post_id, 1 if created else 0)
+    _bump_comment_post(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if (
+        instance.post_id in _deleting_ids('posts')
+        or instance.author_id in _deleting_ids('authors')
+    ):
+        return
+    _touch_post(instance.post_id, -1)
+    _bump_comment_post(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_scopes(sender, instance, **kwargs):
+    """Публикация может сменить категорию или автора: старые ленты
+    тоже нужно сбросить."""
+    old = Post.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._old_scopes = post_scopes(old) if old else []
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, **kwargs):
+    _bump_versions(
+        *post_scopes(instance), *getattr(instance, '_old_scopes', ())
+    )
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post(sender, instance, **kwargs):
+    """Комментарии удаляемой публикации удаляются вместе с ней, её
+    счётчик и кеш им обновлять не нужно."""
+    _deleting_ids('posts').add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_ids('posts').discard(instance.pk)
+    _bump_versions(*post_scopes(instance))
+    if settings.BLOG_DELETE_POST_MEDIA and instance.image:
+        transaction.on_commit(lambda: _delete_post_media(
+            instance.image.storage, instance.image.name,
+            instance.image_variants,
+        ))
+
+
+def _delete_post_media(storage, image_name, image_variants):
+    """Одинаковые фото хранятся одним файлом: он и его копии удаляются,
+    только если на него не ссылается ни одна публикация."""
+    if Post.objects.filter(image=image_name).exists():
+        return
+    storage.delete(image_name)
+    delete_variants(storage, image_variants, keep=Post.objects.used_variants(
+        variant['name'] for variant in image_variants.get('variants', ())
+    ))
+
+
+@receiver(post_save, sender=Category)
+def update_category_visibility(sender, instance, **kwargs):
+    """Видимость всех публикаций категории меняется одним UPDATE."""
+    instance.posts.update(
+        is_visible=F('is_published') if instance.is_published else False
+    )
+
+
+@receiver(pre_delete, sender=Category)
+def hide_category_posts(sender, instance, **kwargs):
+    """После удаления категории её публикации остаются без
+    категории и в лентах не видны."""
+    instance.posts.update(is_visible=False)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    _bump_versions(
+        GLOBAL_SCOPE, INDEX_SCOPE, LOOKUPS_SCOPE, category_scope(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def location_changed(sender, instance, **kwargs):
+    _bump_versions(GLOBAL_SCOPE, LOOKUPS_SCOPE)
+
+
+@receiver(pre_delete, sender=User)
+def remember_deleted_author(sender, instance, **kwargs):
+    """Комментарии пользователя удаляются каскадом: счётчики
+    публикаций других авторов уменьшаются одним UPDATE, а их кеш
+    сбрасывается один раз."""
+    _deleting_ids('authors').add(instance.pk)
+    posts = Post.objects.filter(
+        pk__in=Comment.objects.filter(author=instance).values('post_id')
+    ).exclude(author=instance)
+    scopes = {
+        scope
+        for post in posts.only('pk', 'category_id', 'author_id')
+        for scope in post_scopes(post)
+    }
+    if not scopes:
+        return
+    posts.update(
+        comment_count=F('comment_count') - Subquery(
+            Comment.objects.filter(author=instance, post=OuterRef('pk'))
+            .order_by().values('post').annotate(count=Count('pk'))
+            .values('count')
+        ),
+        updated_at=timezone.now(),
+    )
+    _bump_versions(*scopes)
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_author(sender, instance, **kwargs):
+    _deleting_ids('authors').discard(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, created=False, update_fields=None,
+                 **kwargs):
+    """Имя автора выводится в карточках всех лент и на его странице.
+    Новый пользователь ещё нигде не выводится, а вход меняет только
+    last_login, поэтому кеш они не сбрасывают."""
+    if created or (
+        update_fields is not None and set(update_fields) <= {'last_login'}
+    ):
+        return
+    _bump_versions(author_scope(instance.pk), INDEX_SCOPE, GLOBAL_SCOPE)
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import re
+from pathlib import PurePosixPath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы называются хешем содержимого и раскладываются по
+    двухуровневому дереву: post_images/ab/cd/abcd….jpg.
+
+    Первая часть исходного имени (post_images из upload_to) остаётся
+    корнем дерева, остальной путь отбрасывается. Одинаковые файлы
+    сохраняются один раз, поэтому на один файл могут ссылаться
+    несколько публикаций.
+    """
+    ADDRESSED_RE = re.compile(
+        r'^[^/]+/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}(\.\w+)?$'
+    )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.addressed_name(name, self.content_hash(content))
+        if self.exists(name):
+            # Свежая отметка времени защищает файл, на который появилась
+            # новая ссылка, от сборщика мусора (collect_media).
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+    @staticmethod
+    def content_hash(content):
+        digest = hashlib.sha256()
+        if content.seekable():
+            content.seek(0)
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        if content.seekable():
+            content.seek(0)
+        return digest.hexdigest()
+
+    @staticmethod
+    def addressed_name(name, digest):
+        path = PurePosixPath(name)
+        root = path.parts[0] if len(path.parts) > 1 else ''
+        return str(PurePosixPath(
+            root, digest[:2], digest[2:4], digest + path.suffix.lower()
+        ))
+
+    def is_addressed(self, name):
+        return bool(self.ADDRESSED_RE.match(name))
+
+
+post_image_storage = ContentAddressedStorage()
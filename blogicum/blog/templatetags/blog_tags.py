@@ -0,0 +1,58 @@
+from django import template
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from blog.cache import cache_post_card, make_hole
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post):
+    """Карточка публикации из кеша, подготовленного
+    prefetch_post_cards(); при промахе рендерится и кешируется."""
+    html = getattr(post, 'card_html', None)
+    if html is None:
+        html = render_to_string('includes/post_card.html', {'post': post})
+        cache_post_card(post, html)
+    return mark_safe(html)
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post, sizes='(max-width: 40rem) 100vw, 40rem'):
+    """Фото публикации с srcset из уменьшенных копий: браузер выбирает
+    подходящую ширину и WebP, если поддерживает его. Размеры и превью
+    берутся из полей публикации, файл при выводе не открывается."""
+    info = post.image_variants or {}
+    srcsets = {}
+    for variant in info.get('variants', ()):
+        srcsets.setdefault(variant['format'], []).append(
+            (post.image.storage.url(variant['name']), variant['width'])
+        )
+    jpeg = srcsets.get('jpeg', [])
+    return {
+        'post': post,
+        'sizes': sizes,
+        'width': post.image_width or info.get('width'),
+        'height': post.image_height or info.get('height'),
+        'placeholder': post.image_placeholder,
+        'src': jpeg[-1][0] if jpeg else post.image.url,
+        'jpeg_srcset': ', '.join(f'{url} {w}w' for url, w in jpeg),
+        'webp_srcset': ', '.join(
+            f'{url} {w}w' for url, w in srcsets.get('webp', [])
+        ),
+    }
+
+
+@register.simple_tag(takes_context=True)
+def personal(context, template_name, **kwargs):
+    """Фрагмент, зависящий от пользователя. На кешируемых страницах
+    вместо него выводится метка, которую fill_holes() заполняет при
+    каждом запросе, поэтому фрагмент получает только kwargs и данные
+    контекстных процессоров."""
+    if context.get('punch_holes'):
+        return mark_safe(make_hole(template_name, **kwargs))
+    with context.push(**kwargs):
+        return context.template.engine.get_template(
+            template_name
+        ).render(context)
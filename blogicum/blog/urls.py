@@ -8,6 +8,12 @@ urlpatterns = [
     path('',
          views.PostListView.as_view(),
          name='index'),
+    path('locations/autocomplete/',
+         views.location_autocomplete,
+         name='location_autocomplete'),
+    path('search/',
+         views.SearchView.as_view(),
+         name='search'),
     path('posts/<int:post_id>/',
          views.PostDetailView.as_view(),
          name='post_detail'),
@@ -26,6 +32,9 @@ urlpatterns = [
     path('posts/<int:post_id>/comment/',
          views.CommentCreateView.as_view(),
          name='add_comment'),
+    path('posts/<int:post_id>/comments/',
+         views.PostCommentsView.as_view(),
+         name='post_comments'),
     path('posts/<int:post_id>/edit_comment/<int:comment_id>/',
          views.CommentUpdateView.as_view(),
          name='edit_comment'),
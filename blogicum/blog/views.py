@@ -1,45 +1,326 @@
+from hashlib import md5
+
 from django.contrib.auth.views import LoginView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import Http404
+from django.core.paginator import InvalidPage
+from django.db import transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from django.views.generic import (
     DetailView, CreateView, ListView, UpdateView, DeleteView
 )
 
-from .forms import ProfileForm, CommentForm, PostForm
-from .models import Post, Comment, User, Category
-from .utils import posts_filtered
+from .cache import (
+    GLOBAL_SCOPE, INDEX_SCOPE, author_scope, cache_page_response,
+    category_scope, fill_holes, get_cached_page, get_version, page_cache_key,
+    post_scope, prefetch_post_cards, scope_last_modified, scope_state
+)
+from .forms import AUTOCOMPLETE_LIMIT, ProfileForm, CommentForm, PostForm
+from .lookups import categories, locations
+from .models import Post, Comment, User
+from .paginators import CursorPaginator, FeedPaginator
+from .search import search_posts
 
 POSTS_PER_PAGE = 10
+NUMBERED_PAGES = 5
+COMMENTS_PER_PAGE = 20
 
 
-class PostListView(ListView):
-    template_name = 'blog/index.html'
+def get_cursor_page(queryset, page_size, cursor=None, key='-pub_date'):
+    paginator = CursorPaginator(queryset, page_size, key=key)
+    try:
+        return paginator.page(cursor)
+    except InvalidPage as e:
+        raise Http404(str(e))
+
+
+class SingleFetchMixin:
+    """Объект страницы загружается из базы один раз за запрос,
+    сколько бы раз ни вызывались dispatch, get и get_context_data."""
+
+    def get_object(self, queryset=None):
+        if not hasattr(self, '_object'):
+            self._object = self.fetch_object(queryset)
+        return self._object
+
+    def fetch_object(self, queryset=None):
+        return super().get_object(queryset)
+
+
+class FeedPaginationMixin:
+    """Первые страницы ленты нумерованные, дальше — по курсору."""
     paginate_by = POSTS_PER_PAGE
+    paginator_class = FeedPaginator
+    numbered_pages = NUMBERED_PAGES
+
+    def get_cache_scope(self):
+        return INDEX_SCOPE
+
+    def get_paginator(self, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True, **kwargs):
+        return self.paginator_class(
+            queryset, per_page, max_pages=self.numbered_pages,
+            scope=self.get_cache_scope(), orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page, **kwargs
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get('cursor')
+        if cursor is None:
+            return super().paginate_queryset(queryset, page_size)
+        page = get_cursor_page(queryset, page_size, cursor)
+        return (
+            page.paginator, page, page.object_list, page.has_other_pages()
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context['page_obj']
+        prefetch_post_cards(page.object_list)
+        if not page.is_cursor:
+            context['page_range'] = list(
+                page.paginator.get_elided_page_range(page.number)
+            )
+        return context
+
+
+class ConditionalGetMixin:
+    """Ответ 304 Not Modified, если страница не менялась с прошлого
+    запроса браузера; шаблон при этом не рендерится.
+
+    ETag учитывает версию общей области (категории, местоположения)
+    и пользователя, для которого отрисованы персональные фрагменты.
+    Last-Modified от пользователя не зависит, поэтому отдаётся и
+    проверяется только для анонимных посетителей: иначе браузер, в
+    котором вошли или вышли, получил бы 304 на чужую страницу.
+    """
+
+    def get_validators(self):
+        """Возвращает (состояние страницы, время последнего
+        изменения)."""
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        state, last_modified = self.get_validators()
+        etag = quote_etag(md5(
+            f'{state}:{get_version(GLOBAL_SCOPE)}:{request.user.pk}'.encode()
+        ).hexdigest())
+        if request.user.is_authenticated or not last_modified:
+            last_modified = None
+        else:
+            last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+
+class FeedConditionalGetMixin(ConditionalGetMixin):
+    """Валидаторы ленты без запросов к базе: то же состояние области,
+    что и в ключе кеша страницы, и момент, когда оно появилось."""
+
+    def get_validators(self):
+        scope = self.get_cache_scope()
+        return scope_state(scope), scope_last_modified(scope)
+
+
+class PageCacheMixin:
+    """Страница кешируется целиком, одна на всех посетителей.
+
+    Ключ включает версию области get_cache_scope(), которую сигналы
+    меняют при изменении публикаций, комментариев, категорий и
+    местоположений, так что устаревшие страницы сразу перестают
+    находиться. Зависящие от пользователя фрагменты (тег personal)
+    попадают в кеш метками и подставляются при каждом запросе.
+    """
+
+    def get_hole_context(self):
+        """Контекст для персональных фрагментов страницы."""
+        return {}
+
+    def get_context_data(self, **kwargs):
+        return dict(**super().get_context_data(**kwargs), punch_holes=True)
+
+    def get(self, request, *args, **kwargs):
+        key = page_cache_key(request, self.get_cache_scope())
+        response = get_cached_page(key)
+        if response is not None:
+            fill_holes(response, request, self.get_hole_context())
+            response['X-Page-Cache'] = 'hit'
+            return response
+        response = super().get(request, *args, **kwargs)
+        response['X-Page-Cache'] = 'miss'
+        response.add_post_render_callback(
+            lambda rendered: cache_page_response(key, rendered)
+        )
+        response.add_post_render_callback(
+            lambda rendered: fill_holes(
+                rendered, request, self.get_hole_context()
+            )
+        )
+        return response
+
+
+class PostListView(FeedConditionalGetMixin, PageCacheMixin,
+                   FeedPaginationMixin, ListView):
+    template_name = 'blog/index.html'
 
     def get_queryset(self):
-        return posts_filtered(Post.objects.all())
+        return Post.objects.published().for_feed()
 
 
-class PostDetailView(DetailView):
+class PostDetailView(SingleFetchMixin, ConditionalGetMixin, PageCacheMixin,
+                     DetailView):
     template_name = 'blog/detail.html'
     model = Post
     pk_url_kwarg = 'post_id'
 
+    def get_queryset(self):
+        return Post.objects.select_related('author').with_lookups()
+
     def dispatch(self, request, *args, **kwargs):
         self.object = self.get_object()
         if (
             not self.object.is_published
-            and (self.object.author != request.user)
+            and (self.object.author_id != request.user.id)
         ):
             raise Http404('This page was not found')
         return super().dispatch(request, *args, **kwargs)
 
+    def get_cache_scope(self):
+        return post_scope(self.object.pk)
+
+    def get_validators(self):
+        post = self.object
+        return (
+            f'{post.updated_at.isoformat()}:{post.comment_count}',
+            post.updated_at,
+        )
+
+    def get_hole_context(self):
+        return {'form': CommentForm()}
+
     def get_context_data(self, **kwargs):
         return dict(**super().get_context_data(**kwargs),
                     form=CommentForm(),
-                    comments=self.object.comments.all())
+                    comments=get_cursor_page(
+                        self.object.comments.select_related('author'),
+                        COMMENTS_PER_PAGE, key='created_at'
+                    ))
+
+
+class PostCommentsView(SingleFetchMixin, ListView):
+    """Следующая порция комментариев к публикации в виде фрагмента
+    HTML для кнопки «Показать ещё»."""
+    template_name = 'includes/comment_list.html'
+    paginate_by = COMMENTS_PER_PAGE
+
+    def fetch_object(self, queryset=None):
+        post = get_object_or_404(Post, pk=self.kwargs['post_id'])
+        if not post.is_published and post.author_id != self.request.user.id:
+            raise Http404('This page was not found')
+        return post
+
+    def get_queryset(self):
+        return self.get_object().comments.select_related('author')
+
+    def paginate_queryset(self, queryset, page_size):
+        page = get_cursor_page(
+            queryset, page_size, self.request.GET.get('cursor'),
+            key='created_at'
+        )
+        return (
+            page.paginator, page, page.object_list, page.has_other_pages()
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        return dict(
+            **context,
+            post=self.get_object(),
+            comments=context['page_obj'],
+        )
+
+
+class SearchView(ListView):
+    """Поиск по опубликованным публикациям, от более релевантных.
+
+    Число совпадений не считается: наличие следующей страницы
+    определяется по одной лишней строке выборки.
+    """
+    template_name = 'blog/search.html'
+    paginate_by = POSTS_PER_PAGE
+    numbered_pages = NUMBERED_PAGES
+
+    def get_query(self):
+        return self.request.GET.get('q', '').strip()
+
+    def get_page_number(self):
+        try:
+            number = int(self.request.GET.get('page', 1))
+        except ValueError:
+            raise Http404('Некорректный номер страницы')
+        if not 1 <= number <= self.numbered_pages:
+            raise Http404('Некорректный номер страницы')
+        return number
+
+    def get_queryset(self):
+        self.page_number = self.get_page_number()
+        rows = search_posts(
+            self.get_query(),
+            limit=self.paginate_by + 1,
+            offset=(self.page_number - 1) * self.paginate_by,
+        )
+        self.has_next = (
+            len(rows) > self.paginate_by
+            and self.page_number < self.numbered_pages
+        )
+        rows = rows[:self.paginate_by]
+        posts = Post.objects.for_feed().in_bulk([pk for pk, *_ in rows])
+        results = []
+        for pk, title, snippet in rows:
+            if pk in posts:
+                post = posts[pk]
+                post.highlighted_title, post.snippet = title, snippet
+                results.append(post)
+        return results
+
+    def paginate_queryset(self, queryset, page_size):
+        return None, None, queryset, False
+
+    def get_context_data(self, **kwargs):
+        return dict(
+            **super().get_context_data(**kwargs),
+            query=self.get_query(),
+            page_number=self.page_number,
+            previous_page_number=(
+                self.page_number - 1 if self.page_number > 1 else None
+            ),
+            next_page_number=(
+                self.page_number + 1 if self.has_next else None
+            ),
+        )
+
+
+def location_autocomplete(request):
+    """Местоположения, название которых начинается с ?q=, для поля
+    формы публикации."""
+    query = request.GET.get('q', '').strip()
+    results = locations.search_prefix(
+        'name', query, AUTOCOMPLETE_LIMIT
+    ) if query else []
+    return JsonResponse({'results': [
+        {'id': location.pk, 'name': location.name} for location in results
+    ]})
 
 
 class PostCreateView(LoginRequiredMixin, CreateView):
@@ -56,15 +337,14 @@ class PostCreateView(LoginRequiredMixin, CreateView):
                        args=[self.request.user.get_username()])
 
 
-class PostMixin(LoginRequiredMixin):
+class PostMixin(SingleFetchMixin, LoginRequiredMixin):
     model = Post
     form_class = PostForm
     template_name = 'blog/create.html'
     pk_url_kwarg = 'post_id'
 
     def dispatch(self, request, *args, **kwargs):
-        instance = get_object_or_404(Post, pk=self.kwargs['post_id'])
-        if instance.author != request.user:
+        if self.get_object().author_id != request.user.id:
             return redirect('blog:post_detail', post_id=self.kwargs['post_id'])
         return super().dispatch(request, *args, **kwargs)
 
@@ -83,20 +363,22 @@ class PostDeleteView(PostMixin, DeleteView):
                        args=[self.request.user.get_username()])
 
 
-class CategoryPosts(ListView):
+class CategoryPosts(SingleFetchMixin, FeedConditionalGetMixin, PageCacheMixin,
+                    FeedPaginationMixin, ListView):
     model = Post
     template_name = 'blog/category.html'
-    context_object_name = 'page_obj'
-    paginate_by = POSTS_PER_PAGE
 
-    def get_object(self):
-        return get_object_or_404(
-            Category,
-            slug=self.kwargs['slug'],
-            is_published=True)
+    def fetch_object(self, queryset=None):
+        category = categories.get_by('slug', self.kwargs['slug'])
+        if category is None or not category.is_published:
+            raise Http404('Категория не найдена')
+        return category
+
+    def get_cache_scope(self):
+        return category_scope(self.get_object().pk)
 
     def get_queryset(self):
-        return posts_filtered(self.get_object().posts)
+        return self.get_object().posts.published().for_feed()
 
     def get_context_data(self, **kwargs):
         return dict(
@@ -113,17 +395,20 @@ class ProfileLoginView(LoginView):
         )
 
 
-class ProfileListView(ListView):
+class ProfileListView(SingleFetchMixin, FeedConditionalGetMixin,
+                      PageCacheMixin, FeedPaginationMixin, ListView):
     model = User
     template_name = 'blog/profile.html'
-    paginate_by = POSTS_PER_PAGE
 
-    def get_object(self):
+    def fetch_object(self, queryset=None):
         return get_object_or_404(User,
                                  username=self.kwargs['slug'])
 
+    def get_cache_scope(self):
+        return author_scope(self.get_object().pk)
+
     def get_queryset(self):
-        return self.get_object().posts.all()
+        return self.get_object().posts.for_feed()
 
     def get_context_data(self, **kwargs):
         return dict(
@@ -145,14 +430,13 @@ class ProfileUpdateView(LoginRequiredMixin, UpdateView):
         return reverse('blog:profile', args=[self.request.user.get_username()])
 
 
-class CommentMixin(LoginRequiredMixin):
+class CommentMixin(SingleFetchMixin, LoginRequiredMixin):
     model = Comment
     template_name = 'blog/comment.html'
     pk_url_kwarg = 'comment_id'
 
     def dispatch(self, request, *args, **kwargs):
-        comment = get_object_or_404(Comment, pk=self.kwargs['comment_id'])
-        if comment.author != request.user:
+        if self.get_object().author_id != request.user.id:
             return redirect('blog:post_detail', post_id=self.kwargs['post_id'])
         return super().dispatch(request, *args, **kwargs)
 
@@ -170,7 +454,8 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         form.instance.author = self.request.user
         form.instance.post = get_object_or_404(Post, pk=self.kwargs['post_id'])
-        return super().form_valid(form)
+        with transaction.atomic():
+            return super().form_valid(form)
 
     def get_success_url(self):
         return reverse(
@@ -188,3 +473,7 @@ class CommentUpdateView(CommentMixin, UpdateView):
 
 class CommentDeleteView(CommentMixin, DeleteView):
     template_name = 'blog/comment.html'
+
+    def delete(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(request, *args, **kwargs)
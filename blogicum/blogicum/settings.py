@@ -138,8 +138,53 @@ CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# blog.media serves uploads under this prefix; it must not be empty.
+MEDIA_URL = '/media/'
+
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 LOGIN_REDIRECT_URL = 'blog:index'
 
 LOGIN_URL = 'login'
+
+
+# Blog caches are invalidated through version keys in the default cache,
+# so every web worker and management command must share it. LocMemCache
+# only suits a single-process runserver; the blog.E001 check rejects it
+# when DEBUG is off. Use Memcached, Redis or DatabaseCache in production.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Counting feed rows stops at this limit; larger feeds get an estimate.
+BLOG_FEED_COUNT_LIMIT = 1000
+
+# Seconds a cached feed count lives; scheduled posts appear without signals.
+BLOG_FEED_COUNT_TIMEOUT = 60
+
+# Seconds a cached feed or post page lives.
+BLOG_PAGE_CACHE_TIMEOUT = 60
+
+# Rendered post cards are keyed by their content, so they may live long.
+BLOG_POST_CARD_TIMEOUT = 60 * 60 * 24
+
+# Rendered lookup <select> elements are keyed by the tables' version.
+BLOG_SELECT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds a worker keeps its in-memory copy of categories and locations.
+BLOG_LOOKUP_TIMEOUT = 60
+
+# Delete a post's photo and its variants right after the post is deleted.
+BLOG_DELETE_POST_MEDIA = True
+
+# Seconds browsers may cache media files whose names are not content hashes.
+BLOG_MEDIA_MAX_AGE = 60 * 60
+
+# None, 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache, lighttpd):
+# let the front proxy send media files instead of Django.
+BLOG_MEDIA_SENDFILE = None
+
+# Internal nginx location that maps to MEDIA_ROOT for X-Accel-Redirect.
+BLOG_MEDIA_SENDFILE_PREFIX = '/protected-media/'
@@ -1,11 +1,21 @@
+import re
+
 from django.contrib import admin
+from django.core.exceptions import ImproperlyConfigured
 from django.contrib.auth.forms import UserCreationForm
 from django.views.generic.edit import CreateView
+from blog.media import serve
 from blog.views import ProfileLoginView
-from django.urls import path, include, reverse_lazy
+from django.urls import path, include, re_path, reverse_lazy
 from django.conf import settings
-from django.conf.urls.static import static
 
+MEDIA_PREFIX = settings.MEDIA_URL.strip('/')
+if not MEDIA_PREFIX:
+    # Без префикса маршрут медиафайлов перехватил бы все адреса.
+    raise ImproperlyConfigured(
+        'MEDIA_URL должен начинаться с непустого префикса, например'
+        ' /media/.'
+    )
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -21,8 +31,11 @@ urlpatterns = [
         ),
         name='registration'),
     path('auth/login/', ProfileLoginView.as_view(), name='login'),
-] + static(settings.MEDIA_URL,
-           document_root=settings.MEDIA_ROOT)
+    re_path(
+        r'^%s/(?P<path>.*)$' % re.escape(MEDIA_PREFIX),
+        serve, name='media'
+    ),
+]
 
 handler404 = 'pages.views.page_not_found'
 handler500 = 'pages.views.server_error'
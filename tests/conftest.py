@@ -41,6 +41,15 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Database rollbacks between tests do not reach the cache.
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
@@ -92,6 +101,7 @@ pytest_plugins = [
     "fixtures.locations",
     "fixtures.categories",
     "fixtures.comments",
+    "fixtures.media",
     "adapters.comment",
 ]
 
@@ -153,6 +163,16 @@ def get_post_list_context_key(
     return post_list_key
 
 
+def get_feed_urls(category, author) -> Tuple[str, ...]:
+    """Адреса лент, в которых выводится публикация этой категории и
+    этого автора."""
+    return (
+        "/",
+        f"/category/{category.slug}/",
+        f"/profile/{author.username}/",
+    )
+
+
 class _TestModelAttrs:
     @property
     def model(self):
@@ -363,6 +383,7 @@ def cleanup(request):
                     filename.endswith(".jpg")
                     or filename.endswith(".gif")
                     or filename.endswith(".png")
+                    or filename.endswith(".webp")
             ):
                 file_path = os.path.join(root, filename)
                 if os.path.getmtime(file_path) >= start_time:
@@ -0,0 +1,28 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    """MEDIA_ROOT во временном каталоге: тесты не пишут в media проекта
+    и не видят локальных загрузок."""
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def make_photo():
+    """Фабрика загружаемых JPEG-фото заданного цвета и размера."""
+
+    def make(color="teal", size=(400, 300), exif=None, name="photo.jpg"):
+        buffer = BytesIO()
+        options = {} if exif is None else {"exif": exif}
+        Image.new("RGB", size, color).save(buffer, "JPEG", **options)
+        return SimpleUploadedFile(
+            name, buffer.getvalue(), content_type="image/jpeg"
+        )
+
+    return make
@@ -88,6 +88,17 @@ def post_with_published_location(
     )
 
 
+@pytest.fixture
+def feed_post(mixer: Mixer, user, published_location, published_category):
+    return mixer.blend(
+        "blog.Post",
+        location=published_location,
+        category=published_category,
+        author=user,
+        pub_date=datetime.now(tz=pytz.UTC) - timedelta(days=1),
+    )
+
+
 @pytest.fixture
 def many_posts_with_published_locations(
     mixer: Mixer, user, published_locations, published_category
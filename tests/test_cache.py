@@ -0,0 +1,186 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from conftest import get_feed_urls
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _cache_status(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.get("X-Page-Cache"), response.content.decode("utf-8")
+
+
+def test_anonymous_feeds_are_cached(unlogged_client, feed_post):
+    for url in get_feed_urls(feed_post.category, feed_post.author):
+        assert _cache_status(unlogged_client, url)[0] == "miss"
+        with CaptureQueriesContext(connection) as ctx:
+            status, _ = _cache_status(unlogged_client, url)
+        assert status == "hit", (
+            f"Убедитесь, что страница `{url}` для анонимных посетителей"
+            " отдаётся из кеша."
+        )
+        assert len(ctx.captured_queries) <= 1
+
+
+def test_personal_fragments_are_not_cached(
+        user, user_client, another_user_client, unlogged_client, feed_post
+):
+    comment = feed_post.comments.create(author=user, text="Текст")
+    urls = (
+        *get_feed_urls(feed_post.category, feed_post.author),
+        f"/posts/{feed_post.id}/",
+    )
+    edit_comment = (
+        f"/posts/{feed_post.id}/edit_comment/{comment.id}/"
+    )
+    for url in urls:
+        assert _cache_status(user_client, url)[0] == "miss"
+        status, content = _cache_status(another_user_client, url)
+        assert status == "hit", (
+            f"Убедитесь, что страница `{url}` отдаётся из кеша и"
+            " авторизованным пользователям."
+        )
+        assert "blog-hole" not in content
+        header = content.split("<header>")[1].split("</header>")[0]
+        assert user.username not in header, (
+            f"Убедитесь, что в шапке страницы `{url}`, взятой из кеша,"
+            " выводится текущий пользователь, а не тот, для кого"
+            " страница попала в кеш."
+        )
+        status, content = _cache_status(unlogged_client, url)
+        assert status == "hit" and "Войти" in content
+
+    status, content = _cache_status(user_client, urls[-1])
+    assert status == "hit"
+    assert edit_comment in content and 'name="text"' in content, (
+        "Убедитесь, что на странице публикации из кеша автору выводятся"
+        " ссылки на редактирование и форма комментария."
+    )
+    content = _cache_status(another_user_client, urls[-1])[1]
+    assert edit_comment not in content
+    assert f"/posts/{feed_post.id}/edit/" not in content
+    content = _cache_status(unlogged_client, urls[-1])[1]
+    assert 'name="text"' not in content
+
+
+@pytest.mark.parametrize("change", ["post", "comment", "category", "location"])
+def test_feed_cache_invalidation(mixer, unlogged_client, feed_post, change):
+    for url in get_feed_urls(feed_post.category, feed_post.author):
+        _cache_status(unlogged_client, url)
+
+    marker = "Изменённое название"
+    if change == "post":
+        feed_post.title = marker
+        feed_post.save()
+    elif change == "comment":
+        mixer.blend("blog.Comment", post=feed_post)
+        marker = "Комментарии (1)"
+    elif change == "category":
+        feed_post.category.title = marker
+        feed_post.category.save()
+    else:
+        feed_post.location.name = marker
+        feed_post.location.save()
+
+    for url in get_feed_urls(feed_post.category, feed_post.author):
+        status, content = _cache_status(unlogged_client, url)
+        assert status == "miss" and marker in content, (
+            f"Убедитесь, что кеш страницы `{url}` сбрасывается при изменении"
+            " публикации, комментария, категории или местоположения."
+        )
+
+
+def test_page_cache_stats(unlogged_client, feed_post, capsys):
+    call_command("page_cache_stats", reset=True)
+    unlogged_client.get("/")
+    unlogged_client.get("/")
+    capsys.readouterr()
+    call_command("page_cache_stats")
+    assert "Попаданий: 1, промахов: 1" in capsys.readouterr().out
+
+
+def test_post_cards_are_cached(mixer, user_client, feed_post, monkeypatch):
+    from blog.templatetags import blog_tags
+
+    rendered = []
+    render = blog_tags.render_to_string
+
+    def counting_render(*args, **kwargs):
+        rendered.append(args[0])
+        return render(*args, **kwargs)
+
+    monkeypatch.setattr(blog_tags, "render_to_string", counting_render)
+    for url in get_feed_urls(feed_post.category, feed_post.author):
+        user_client.get(url)
+    assert len(rendered) == 1, (
+        "Убедитесь, что карточка публикации рендерится один раз и дальше"
+        " берётся из кеша на всех лентах."
+    )
+
+    mixer.blend("blog.Comment", post=feed_post)
+    content = user_client.get("/").content.decode("utf-8")
+    assert len(rendered) == 2 and "Комментарии (1)" in content, (
+        "Убедитесь, что кеш карточки сбрасывается при изменении числа"
+        " комментариев."
+    )
+
+
+def test_profile_edit_resets_cache(user, user_client, unlogged_client,
+                                   feed_post):
+    old_url = f"/profile/{user.username}/"
+    _cache_status(unlogged_client, old_url)
+    assert _cache_status(unlogged_client, old_url)[0] == "hit"
+    _cache_status(unlogged_client, "/")
+    user_client.post(
+        "/edit_profile/",
+        {
+            "username": "renamed_author",
+            "first_name": "Новое",
+            "last_name": "Имя",
+            "email": "renamed@example.com",
+        },
+    )
+    assert unlogged_client.get(old_url).status_code == 404, (
+        "Убедитесь, что после смены имени пользователя старая страница"
+        " профиля не отдаётся из кеша."
+    )
+    _, content = _cache_status(unlogged_client, "/profile/renamed_author/")
+    assert "Новое Имя" in content, (
+        "Убедитесь, что после редактирования профиля страница профиля"
+        " показывает новые данные."
+    )
+    _, content = _cache_status(unlogged_client, "/")
+    assert "renamed_author" in content, (
+        "Убедитесь, что карточки публикаций показывают новое имя автора."
+    )
+
+
+def test_feeds_work_without_cache(settings, unlogged_client, feed_post):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }
+    }
+    for url in get_feed_urls(feed_post.category, feed_post.author):
+        assert _cache_status(unlogged_client, url)[0] == "miss", (
+            "Убедитесь, что без кеша ленты отдаются, а не падают с ошибкой."
+        )
+
+
+def test_versions_are_bumped_after_commit(
+        feed_post, django_capture_on_commit_callbacks
+):
+    from blog.cache import INDEX_SCOPE, get_version
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        feed_post.title = "Новый заголовок"
+        feed_post.save()
+        version = get_version(INDEX_SCOPE)
+    assert callbacks
+    assert get_version(INDEX_SCOPE) != version, (
+        "Убедитесь, что версии кеша меняются и после фиксации транзакции."
+    )
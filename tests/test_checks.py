@@ -0,0 +1,23 @@
+LOCMEM = "django.core.cache.backends.locmem.LocMemCache"
+
+
+def _check_ids(settings, backend, debug):
+    from blog.checks import check_shared_cache
+
+    settings.DEBUG = debug
+    settings.CACHES = {"default": {"BACKEND": backend}}
+    return [message.id for message in check_shared_cache(None)]
+
+
+def test_process_local_cache_is_rejected(settings):
+    assert _check_ids(settings, LOCMEM, debug=False) == ["blog.E001"], (
+        "Убедитесь, что без DEBUG кеш в памяти процесса считается ошибкой:"
+        " сброс кешей блога не дойдёт до других процессов."
+    )
+    assert _check_ids(settings, LOCMEM, debug=True) == ["blog.W001"]
+
+
+def test_shared_cache_passes(settings):
+    assert _check_ids(
+        settings, "django.core.cache.backends.db.DatabaseCache", debug=False
+    ) == []
@@ -0,0 +1,133 @@
+import os
+import time
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+# Сборщик мусора не должен видеть локальные загрузки разработчика.
+pytestmark = [
+    pytest.mark.django_db(transaction=True),
+    pytest.mark.usefixtures("media_root"),
+]
+
+DAY = 60 * 60 * 24
+
+
+def _storage():
+    from blog.models import Post
+
+    return Post._meta.get_field("image").storage
+
+
+def _make_old(name):
+    old = time.time() - 2 * DAY
+    os.utime(_storage().path(name), (old, old))
+
+
+@pytest.fixture
+def make_orphan(make_photo):
+    def make(color):
+        return _storage().save(
+            "post_images/orphan.jpg", ContentFile(make_photo(color).read())
+        )
+
+    return make
+
+
+def test_collect_media(
+        post_with_published_location, make_photo, make_orphan, capsys
+):
+    post = post_with_published_location
+    post.image = make_photo()
+    post.save()
+    storage = _storage()
+    old_orphan = make_orphan("red")
+    young_orphan = make_orphan("blue")
+    for name in (post.image.name, old_orphan):
+        _make_old(name)
+    size = storage.size(old_orphan)
+
+    call_command("collect_media", dry_run=True)
+    assert "Можно удалить файлов: 1" in capsys.readouterr().out
+    assert storage.exists(old_orphan)
+
+    call_command("collect_media", batch_size=1)
+    assert (
+        f"Удалено файлов: 1, освобождено байт: {size}."
+        in capsys.readouterr().out
+    ), (
+        "Убедитесь, что команда collect_media удаляет файлы без ссылок и"
+        " сообщает, сколько байт освобождено."
+    )
+    assert not storage.exists(old_orphan)
+    assert storage.exists(post.image.name), (
+        "Убедитесь, что collect_media не удаляет фото публикаций."
+    )
+    assert storage.exists(young_orphan), (
+        "Убедитесь, что collect_media не удаляет недавно загруженные файлы."
+    )
+
+
+def test_deduplicated_upload_is_protected(
+        post_with_published_location, make_photo, make_orphan
+):
+    post = post_with_published_location
+    name = make_orphan("red")
+    _make_old(name)
+    post.image = make_photo("red")
+    post.save()
+    assert post.image.name == name
+    assert os.stat(_storage().path(name)).st_mtime > time.time() - DAY, (
+        "Убедитесь, что повторная загрузка того же файла обновляет его"
+        " время изменения, чтобы сборщик мусора его не удалил."
+    )
+
+
+def test_post_delete_removes_media(
+        post_with_published_location, post_with_another_category, make_photo
+):
+    storage = _storage()
+    first, second = post_with_published_location, post_with_another_category
+    for post in (first, second):
+        post.image = make_photo()
+        post.save()
+    name = first.image.name
+    first.delete()
+    assert storage.exists(name), (
+        "Убедитесь, что при удалении публикации не удаляется фото, на"
+        " которое ссылается другая публикация."
+    )
+    second.delete()
+    assert not storage.exists(name), (
+        "Убедитесь, что при удалении публикации удаляется её фото."
+    )
+
+
+def test_collect_media_merges_runs(
+        post_with_published_location, post_with_another_category,
+        post_of_another_author, make_photo, make_orphan, monkeypatch, capsys
+):
+    from blog.management.commands import collect_media
+
+    monkeypatch.setattr(collect_media, "MERGE_FAN_IN", 2)
+    storage = _storage()
+    posts = (
+        post_with_published_location, post_with_another_category,
+        post_of_another_author,
+    )
+    for post, color in zip(posts, ("teal", "olive", "navy")):
+        post.image = make_photo(color)
+        post.save()
+        _make_old(post.image.name)
+    orphan = make_orphan("red")
+    _make_old(orphan)
+
+    call_command("collect_media", batch_size=1)
+    assert "Удалено файлов: 1," in capsys.readouterr().out, (
+        "Убедитесь, что collect_media сливает временные файлы со ссылками"
+        " по частям и не теряет ссылки."
+    )
+    assert not storage.exists(orphan)
+    for post in posts:
+        assert storage.exists(post.image.name)
@@ -0,0 +1,95 @@
+import pytest
+from django.core.management import call_command
+from mixer.backend.django import Mixer
+
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _stored_count(post) -> int:
+    return Post.objects.values_list(
+        "comment_count", flat=True
+    ).get(pk=post.pk)
+
+
+def test_comment_count_follows_comments(
+        mixer: Mixer, post_with_published_location, another_user
+):
+    post = post_with_published_location
+    comments = mixer.cycle(3).blend("blog.Comment", post=post)
+    mixer.blend("blog.Comment", post=post, author=another_user)
+    assert _stored_count(post) == 4, (
+        "Убедитесь, что при добавлении комментария увеличивается счётчик"
+        " комментариев публикации."
+    )
+
+    comments[0].delete()
+    assert _stored_count(post) == 3, (
+        "Убедитесь, что при удалении комментария уменьшается счётчик"
+        " комментариев публикации."
+    )
+
+    another_user.delete()
+    assert _stored_count(post) == 2, (
+        "Убедитесь, что счётчик комментариев уменьшается при каскадном"
+        " удалении комментариев."
+    )
+
+
+def test_recount_comments_fixes_drift(
+        mixer: Mixer, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(2).blend("blog.Comment", post=post)
+    Post.objects.filter(pk=post.pk).update(comment_count=10)
+
+    call_command("recount_comments", batch_size=1)
+
+    assert _stored_count(post) == 2, (
+        "Убедитесь, что команда `recount_comments` исправляет расхождение"
+        " счётчика комментариев."
+    )
+
+
+def test_recount_comments_in_batches(
+        mixer: Mixer, post_with_published_location, post_with_another_category,
+        capsys
+):
+    with_comments = post_with_published_location
+    without_comments = post_with_another_category
+    mixer.blend("blog.Comment", post=with_comments)
+    Post.objects.update(comment_count=5)
+
+    call_command("recount_comments", batch_size=1)
+
+    assert "исправлено: 2." in capsys.readouterr().out
+    assert _stored_count(with_comments) == 1
+    assert _stored_count(without_comments) == 0, (
+        "Убедитесь, что `recount_comments` обнуляет счётчик публикации"
+        " без комментариев."
+    )
+    call_command("recount_comments")
+    assert "исправлено: 0." in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("deleted", ["post", "author"])
+def test_cascade_delete_does_not_touch_post_per_comment(
+        mixer: Mixer, post_with_published_location, another_user,
+        django_assert_max_num_queries, deleted
+):
+    post = post_with_published_location
+    other_post = mixer.blend("blog.Post", author=another_user)
+    mixer.cycle(50).blend("blog.Comment", post=post)
+    mixer.cycle(50).blend("blog.Comment", post=other_post, author=post.author)
+    mixer.blend("blog.Comment", post=other_post)
+    with django_assert_max_num_queries(20):
+        if deleted == "post":
+            post.delete()
+        else:
+            post.author.delete()
+    expected = 51 if deleted == "post" else 1
+    assert _stored_count(other_post) == expected, (
+        "Убедитесь, что при каскадном удалении комментариев счётчик"
+        " публикации обновляется одним запросом."
+    )
@@ -0,0 +1,134 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import Mixer
+
+from conftest import get_feed_urls
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _urls(post):
+    return (
+        *get_feed_urls(post.category, post.author),
+        f"/posts/{post.id}/",
+    )
+
+
+def _validators(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.has_header("ETag"), (
+        f"Убедитесь, что ответ страницы `{url}` содержит заголовок ETag."
+    )
+    assert "Cookie" in response.get("Vary", ""), (
+        f"Убедитесь, что ответ страницы `{url}` содержит Vary: Cookie:"
+        " персональные фрагменты зависят от пользователя."
+    )
+    return response["ETag"], response.get("Last-Modified")
+
+
+def test_not_modified(user_client, unlogged_client, feed_post, monkeypatch):
+    from django.template.response import SimpleTemplateResponse
+
+    for url in _urls(feed_post):
+        etag, last_modified = _validators(user_client, url)
+        assert last_modified is None, (
+            f"Убедитесь, что страница `{url}` не отдаёт Last-Modified"
+            " вошедшему пользователю: он не зависит от пользователя."
+        )
+        anonymous_etag, anonymous_last_modified = _validators(
+            unlogged_client, url
+        )
+        assert anonymous_last_modified, (
+            f"Убедитесь, что страница `{url}` отдаёт анонимным посетителям"
+            " заголовок Last-Modified."
+        )
+
+        def fail_render(*args, **kwargs):
+            raise AssertionError(
+                f"Убедитесь, что для ответа 304 на странице `{url}`"
+                " шаблон не рендерится."
+            )
+
+        with monkeypatch.context() as patch:
+            patch.setattr(SimpleTemplateResponse, "render", fail_render)
+            response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304, (
+                f"Убедитесь, что страница `{url}` отвечает 304 Not Modified"
+                " на запрос с совпадающим ETag."
+            )
+            response = unlogged_client.get(
+                url, HTTP_IF_MODIFIED_SINCE=anonymous_last_modified
+            )
+            assert response.status_code == 304
+
+        assert user_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=anonymous_last_modified
+        ).status_code == 200, (
+            f"Убедитесь, что вошедший пользователь не получает 304 на"
+            f" страницу `{url}`, закешированную до входа."
+        )
+        assert unlogged_client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        ).status_code == 200, (
+            f"Убедитесь, что ETag страницы `{url}` зависит от пользователя:"
+            " шапка страницы у разных пользователей разная."
+        )
+
+
+@pytest.mark.parametrize("change", ["post", "comment", "category"])
+def test_modified(mixer: Mixer, user_client, feed_post, change):
+    etags = {url: _validators(user_client, url)[0] for url in _urls(feed_post)}
+
+    if change == "post":
+        feed_post.title = "Изменённое название"
+        feed_post.save()
+    elif change == "comment":
+        mixer.blend("blog.Comment", post=feed_post)
+    else:
+        feed_post.category.title = "Изменённое название"
+        feed_post.category.save()
+
+    for url, etag in etags.items():
+        assert user_client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        ).status_code == 200, (
+            f"Убедитесь, что ETag страницы `{url}` меняется при изменении"
+            " публикации, комментариев или категории."
+        )
+
+
+def test_feed_validators_do_not_scan_feed(
+        mixer: Mixer, unlogged_client, feed_post
+):
+    url = f"/category/{feed_post.category.slug}/"
+    last_modified = _validators(unlogged_client, url)[1]
+    assert unlogged_client.get(
+        url, HTTP_IF_MODIFIED_SINCE=last_modified
+    ).status_code == 304
+    mixer.blend("blog.Comment", post=feed_post)
+    with CaptureQueriesContext(connection) as ctx:
+        _validators(unlogged_client, url)
+    assert not [
+        query for query in ctx.captured_queries
+        if "MAX(" in query["sql"] or "SUM(" in query["sql"]
+    ], (
+        "Убедитесь, что валидаторы ленты строятся из версий кеша, без"
+        " обхода всей ленты."
+    )
+
+
+def test_cached_page_keeps_no_validators(
+        user_client, unlogged_client, feed_post
+):
+    for url in _urls(feed_post):
+        anonymous = unlogged_client.get(url)
+        assert anonymous.has_header("Last-Modified")
+        response = user_client.get(url)
+        assert response["X-Page-Cache"] == "hit"
+        assert not response.has_header("Last-Modified"), (
+            f"Убедитесь, что страница `{url}` из кеша не отдаёт вошедшему"
+            " пользователю Last-Modified первого посетителя."
+        )
+        assert response["ETag"] != anonymous["ETag"]
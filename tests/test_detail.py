@@ -0,0 +1,95 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _lookups(client, url, table):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f"Убедитесь, что страница `{url}` загружается без ошибок."
+    )
+    return [
+        query["sql"] for query in ctx.captured_queries
+        if query["sql"].startswith("SELECT")
+        and f'FROM "{table}" ' in query["sql"]
+        and "WHERE" in query["sql"]
+        and f'"{table}"."id" = ' in query["sql"]
+    ]
+
+
+def test_object_fetched_once(
+        user_client, post_with_published_location, comment_to_a_post
+):
+    post = post_with_published_location
+    comment = comment_to_a_post
+    comment.author = post.author
+    comment.save()
+    for url in (
+        f"/posts/{post.id}/",
+        f"/posts/{post.id}/edit/",
+        f"/posts/{post.id}/delete/",
+    ):
+        assert len(_lookups(user_client, url, "blog_post")) == 1, (
+            f"Убедитесь, что на странице `{url}` публикация загружается"
+            " из базы данных один раз."
+        )
+    for url in (
+        f"/posts/{post.id}/edit_comment/{comment.id}/",
+        f"/posts/{post.id}/delete_comment/{comment.id}/",
+    ):
+        assert len(_lookups(user_client, url, "blog_comment")) == 1, (
+            f"Убедитесь, что на странице `{url}` комментарий загружается"
+            " из базы данных один раз."
+        )
+
+
+def test_comments_are_paginated(
+        mixer, unlogged_client, post_with_published_location
+):
+    from blog.views import COMMENTS_PER_PAGE
+
+    post = post_with_published_location
+    comments = mixer.cycle(COMMENTS_PER_PAGE * 2 + 5).blend(
+        "blog.Comment", post=post
+    )
+    expected = [
+        comment.pk
+        for comment in sorted(comments, key=lambda c: (c.created_at, c.pk))
+    ]
+
+    from blog.lookups import categories, locations
+
+    categories.snapshot()
+    locations.snapshot()
+    with CaptureQueriesContext(connection) as ctx:
+        response = unlogged_client.get(f"/posts/{post.id}/")
+    page = response.context["comments"]
+    assert len(page) == COMMENTS_PER_PAGE, (
+        "Убедитесь, что на странице публикации сразу выводится только"
+        " первая порция комментариев."
+    )
+    assert len(ctx.captured_queries) <= 3, (
+        "Убедитесь, что авторы комментариев загружаются одним запросом"
+        " вместе с комментариями."
+    )
+    seen = [comment.pk for comment in page]
+    cursor = page.next_cursor
+    while cursor:
+        response = unlogged_client.get(
+            f"/posts/{post.id}/comments/?cursor={cursor}"
+        )
+        assert response.status_code == 200
+        assert "<html" not in response.content.decode("utf-8"), (
+            "Убедитесь, что следующая порция комментариев возвращается"
+            " фрагментом HTML, а не целой страницей."
+        )
+        page = response.context["comments"]
+        seen += [comment.pk for comment in page]
+        cursor = page.next_cursor
+    assert seen == expected, (
+        "Убедитесь, что при подгрузке комментарии не теряются и не"
+        " повторяются."
+    )
@@ -0,0 +1,306 @@
+import re
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+from conftest import N_PER_PAGE, get_feed_urls
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _count_queries(client, url: str) -> int:
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f"Убедитесь, что страница `{url}` загружается без ошибок."
+    )
+    return len(ctx.captured_queries)
+
+
+def _load_lookups():
+    from blog.lookups import categories, locations
+
+    categories.snapshot()
+    locations.snapshot()
+
+
+def test_feed_queries_do_not_depend_on_page_size(
+        mixer: Mixer, user, unlogged_client, published_category,
+        published_location
+):
+    post = mixer.blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        location=published_location,
+    )
+    mixer.cycle(2).blend("blog.Comment", post=post)
+    _load_lookups()
+    queries_for_one = [
+        _count_queries(unlogged_client, url)
+        for url in get_feed_urls(published_category, user)
+    ]
+
+    posts = mixer.cycle(9).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        location=published_location,
+    )
+    for post in posts:
+        mixer.cycle(2).blend("blog.Comment", post=post)
+    queries_for_many = [
+        _count_queries(unlogged_client, url)
+        for url in get_feed_urls(published_category, user)
+    ]
+
+    assert queries_for_one == queries_for_many, (
+        "Убедитесь, что число запросов к базе данных на страницах ленты"
+        " не зависит от количества публикаций на странице."
+    )
+
+
+def test_feed_comment_count(
+        mixer: Mixer, user, unlogged_client, published_category,
+        published_location
+):
+    post = mixer.blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        location=published_location,
+    )
+    mixer.cycle(3).blend("blog.Comment", post=post)
+    for url in get_feed_urls(published_category, user):
+        content = unlogged_client.get(url).content.decode("utf-8")
+        assert "Комментарии (3)" in content, (
+            f"Убедитесь, что на странице `{url}` в карточке публикации"
+            " выводится число её комментариев."
+        )
+
+
+def _post_list_queries(captured_queries):
+    return [
+        query["sql"] for query in captured_queries
+        if query["sql"].startswith("SELECT")
+        and 'FROM "blog_post"' in query["sql"]
+        and "ORDER BY" in query["sql"]
+    ]
+
+
+def _query_plan(sql: str) -> str:
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return "\n".join(row[-1] for row in cursor.fetchall())
+
+
+def test_feeds_use_indexes(
+        mixer: Mixer, user, unlogged_client, published_category,
+        published_location
+):
+    mixer.cycle(3).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        location=published_location,
+    )
+    for url in get_feed_urls(published_category, user):
+        with CaptureQueriesContext(connection) as ctx:
+            unlogged_client.get(url)
+        queries = _post_list_queries(ctx.captured_queries)
+        assert queries, (
+            f"Убедитесь, что страница `{url}` выводит публикации."
+        )
+        for sql in queries:
+            plan = _query_plan(sql)
+            assert re.search(r"blog_post USING (COVERING )?INDEX", plan), (
+                f"Убедитесь, что запрос публикаций для страницы `{url}`"
+                " использует составной индекс."
+            )
+            assert "TEMP B-TREE" not in plan, (
+                f"Убедитесь, что публикации для страницы `{url}`"
+                " сортируются по индексу, без временной сортировки."
+            )
+
+
+@pytest.fixture
+def cursor_feed(mixer: Mixer, user, published_category, monkeypatch):
+    from blog import views
+
+    monkeypatch.setattr(views.PostListView, "numbered_pages", 1)
+    same_date = timezone.now() - timedelta(days=1)
+    posts = mixer.cycle(N_PER_PAGE).blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=same_date,
+    )
+    posts += mixer.cycle(N_PER_PAGE + 3).blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=(same_date + timedelta(minutes=i) for i in range(-5, 99)),
+    )
+    return sorted(posts, key=lambda p: (p.pub_date, p.pk), reverse=True)
+
+
+def test_cursor_pagination(unlogged_client, cursor_feed):
+    response = unlogged_client.get("/")
+    page = response.context["page_obj"]
+    seen = [post.pk for post in page]
+    cursor = page.next_cursor
+    assert cursor, (
+        "Убедитесь, что после последней нумерованной страницы лента"
+        " продолжается по курсору."
+    )
+    pages = 1
+    while cursor:
+        with CaptureQueriesContext(connection) as ctx:
+            response = unlogged_client.get(f"/?cursor={cursor}")
+        assert response.status_code == 200
+        for sql in _post_list_queries(ctx.captured_queries):
+            assert "TEMP B-TREE" not in _query_plan(sql), (
+                "Убедитесь, что страницы ленты по курсору выбираются"
+                " по индексу."
+            )
+        page = response.context["page_obj"]
+        seen += [post.pk for post in page]
+        cursor = page.next_cursor
+        pages += 1
+        assert pages < 10
+    assert seen == [post.pk for post in cursor_feed], (
+        "Убедитесь, что при листании ленты по курсору публикации не"
+        " теряются и не повторяются."
+    )
+
+    response = unlogged_client.get(
+        f"/?cursor={response.context['paginator'].last_cursor}"
+    )
+    page = response.context["page_obj"]
+    assert not page.has_next() and page.has_previous()
+    seen = [post.pk for post in page]
+    while page.has_previous():
+        response = unlogged_client.get(f"/?cursor={page.previous_cursor}")
+        page = response.context["page_obj"]
+        seen = [post.pk for post in page] + seen
+    assert seen == [post.pk for post in cursor_feed], (
+        "Убедитесь, что лента по курсору листается и в обратную сторону."
+    )
+
+
+def test_deep_numbered_pages_not_found(unlogged_client, cursor_feed):
+    assert unlogged_client.get("/?page=2").status_code == 404, (
+        "Убедитесь, что нумерованные страницы доступны только в начале"
+        " ленты."
+    )
+    assert unlogged_client.get("/?cursor=garbage").status_code == 404, (
+        "Убедитесь, что некорректный курсор приводит к ошибке 404."
+    )
+
+
+def test_feed_count_is_cached(
+        mixer: Mixer, user, user_client, published_category
+):
+    mixer.cycle(N_PER_PAGE + 1).blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    for url in get_feed_urls(published_category, user):
+        user_client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = user_client.get(f"{url}?page=1")
+        assert not [
+            query for query in ctx.captured_queries
+            if "COUNT(" in query["sql"]
+        ], f"Убедитесь, что число публикаций для `{url}` кешируется."
+        assert response.context["paginator"].num_pages == 2
+
+    mixer.cycle(N_PER_PAGE).blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    for url in get_feed_urls(published_category, user):
+        response = user_client.get(url)
+        assert response.context["paginator"].num_pages == 3, (
+            f"Убедитесь, что кеш числа публикаций для `{url}` сбрасывается"
+            " при добавлении публикации."
+        )
+
+
+def test_feed_count_estimate(
+        mixer: Mixer, user, unlogged_client, published_category, settings
+):
+    settings.BLOG_FEED_COUNT_LIMIT = 0
+    mixer.cycle(N_PER_PAGE * 6).blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    paginator = unlogged_client.get("/").context["paginator"]
+    assert paginator.count_is_estimated
+    assert paginator.last_cursor, (
+        "Убедитесь, что для больших лент ссылка на последнюю страницу"
+        " ведёт по курсору."
+    )
+
+
+def test_paginator_size_on_large_feed(
+        user, unlogged_client, published_category, settings, monkeypatch
+):
+    from blog import views
+    from blog.models import Post
+
+    monkeypatch.setattr(views.PostListView, "numbered_pages", 10 ** 6)
+    settings.BLOG_FEED_COUNT_LIMIT = 10 ** 6
+    pub_date = timezone.now() - timedelta(days=1)
+    Post.objects.bulk_create(
+        Post(
+            title=f"Post {i}", text="text", pub_date=pub_date,
+            author=user, category=published_category, is_visible=True,
+        )
+        for i in range(N_PER_PAGE * 1000)
+    )
+
+    for page in (1, 500, 1000):
+        response = unlogged_client.get(f"/?page={page}")
+        assert response.status_code == 200
+        content = response.content.decode("utf-8")
+        assert content.count('class="page-item') < 20, (
+            "Убедитесь, что пагинатор выводит только страницы вокруг"
+            " текущей и по краям, а не все номера страниц."
+        )
+        assert len(response.content) < 50_000, (
+            "Убедитесь, что размер страницы ленты не растёт вместе"
+            " с числом страниц."
+        )
+        if page != 1000:
+            assert 'href="?page=1000"' in content, (
+                "Убедитесь, что пагинатор сохраняет ссылку на последнюю"
+                " страницу."
+            )
+
+
+def test_feed_uses_excerpt(
+        mixer: Mixer, user, unlogged_client, published_category
+):
+    from django.core.management import call_command
+
+    from blog.models import Post
+
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        text=" ".join(f"word{i}" for i in range(30)),
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    Post.objects.filter(pk=post.pk).update(excerpt="")
+    call_command("fill_excerpts", batch_size=1)
+
+    with CaptureQueriesContext(connection) as ctx:
+        content = unlogged_client.get("/").content.decode("utf-8")
+    assert "word9 …" in content and "word10" not in content, (
+        "Убедитесь, что в карточке публикации выводится анонс из первых"
+        " десяти слов текста."
+    )
+    for sql in _post_list_queries(ctx.captured_queries):
+        assert '"blog_post"."text"' not in sql, (
+            "Убедитесь, что лента не загружает полный текст публикаций."
+        )
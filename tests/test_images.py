@@ -0,0 +1,177 @@
+import pytest
+from django.core.management import call_command
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db, pytest.mark.usefixtures("media_root")]
+
+
+@pytest.fixture
+def photo_post(post_with_published_location, make_photo):
+    post = post_with_published_location
+    post.image = make_photo(size=(1600, 1200))
+    post.save()
+    call_command("run_jobs", once=True, processes=0)
+    post.refresh_from_db()
+    return post
+
+
+def test_variants_created_on_upload(photo_post):
+    info = photo_post.image_variants
+    assert info["source"] == photo_post.image.name
+    assert (info["width"], info["height"]) == (1600, 1200)
+    assert {
+        (variant["width"], variant["format"]) for variant in info["variants"]
+    } == {
+        (width, image_format)
+        for width in (320, 640, 1280)
+        for image_format in ("jpeg", "webp")
+    }, (
+        "Убедитесь, что при загрузке фото публикации создаются копии"
+        " нескольких ширин в форматах JPEG и WebP."
+    )
+    storage = photo_post.image.storage
+    for variant in info["variants"]:
+        with storage.open(variant["name"]) as file:
+            assert Image.open(file).size == (
+                variant["width"], variant["height"]
+            )
+
+
+def test_card_uses_srcset(unlogged_client, photo_post):
+    content = unlogged_client.get("/").content.decode("utf-8")
+    assert 'type="image/webp"' in content and "320w" in content, (
+        "Убедитесь, что карточка публикации выводит фото со srcset из"
+        " уменьшенных копий."
+    )
+    assert 'width="1600" height="1200"' in content
+
+
+def test_backfill_command(photo_post, capsys):
+    from blog.models import Post
+
+    Post.objects.filter(pk=photo_post.pk).update(image_variants={})
+    call_command("make_image_variants", batch_size=1)
+    assert "Обработано фото: 1" in capsys.readouterr().out
+    photo_post.refresh_from_db()
+    assert len(photo_post.image_variants["variants"]) == 6, (
+        "Убедитесь, что команда make_image_variants создаёт копии для"
+        " фото без них."
+    )
+    call_command("make_image_variants")
+    assert "Обработано фото: 0" in capsys.readouterr().out
+
+
+def test_dimensions_and_placeholder_stored(photo_post):
+    assert (photo_post.image_width, photo_post.image_height) == (1600, 1200)
+    placeholder = photo_post.image_placeholder
+    assert placeholder.startswith("data:image/jpeg;base64,"), (
+        "Убедитесь, что для фото публикации сохраняется превью в виде"
+        " data: URI."
+    )
+    assert len(placeholder) < 2000
+
+
+def test_render_does_not_open_files(
+        unlogged_client, photo_post, monkeypatch
+):
+    from django.db.models.fields.files import FieldFile
+
+    def forbidden(*args, **kwargs):
+        raise AssertionError(
+            "Убедитесь, что при выводе фото файл не открывается."
+        )
+
+    monkeypatch.setattr(FieldFile, "open", forbidden)
+    monkeypatch.setattr(photo_post.image.storage, "open", forbidden)
+    for url in ("/", f"/posts/{photo_post.pk}/"):
+        content = unlogged_client.get(url).content.decode("utf-8")
+        assert 'width="1600" height="1200"' in content
+        assert photo_post.image_placeholder in content, (
+            "Убедитесь, что превью фото выводится на странице."
+        )
+
+
+def test_missing_file_without_dimensions(photo_post):
+    from blog.models import Post
+
+    Post.objects.filter(pk=photo_post.pk).update(
+        image="post_images/missing.jpg", image_width=None, image_height=None
+    )
+    post = Post.objects.get(pk=photo_post.pk)
+    assert post.image_width is None
+
+
+def test_fill_image_previews(photo_post, capsys):
+    from blog.models import Post
+
+    Post.objects.filter(pk=photo_post.pk).update(
+        image_width=None, image_height=None, image_placeholder=""
+    )
+    call_command("fill_image_previews", batch_size=1)
+    assert "Обработано фото: 1" in capsys.readouterr().out
+    post = Post.objects.get(pk=photo_post.pk)
+    assert (post.image_width, post.image_height) == (1600, 1200)
+    assert post.image_placeholder == photo_post.image_placeholder, (
+        "Убедитесь, что команда fill_image_previews заполняет размеры и"
+        " превью фото."
+    )
+    call_command("fill_image_previews")
+    assert "Обработано фото: 0" in capsys.readouterr().out
+
+
+def test_backfill_skips_replaced_image(photo_post, monkeypatch, capsys):
+    from blog.management.commands import make_image_variants
+    from blog.models import Post
+
+    def replace_during_processing(image):
+        info = make_variants(image)
+        Post.objects.filter(pk=photo_post.pk).update(
+            image="post_images/replaced.jpg", image_variants={}
+        )
+        return info
+
+    make_variants = make_image_variants.make_variants
+    monkeypatch.setattr(
+        make_image_variants, "make_variants", replace_during_processing
+    )
+    call_command("make_image_variants", force=True)
+    assert "Обработано фото: 0" in capsys.readouterr().out
+    assert Post.objects.get(pk=photo_post.pk).image_variants == {}, (
+        "Убедитесь, что make_image_variants не записывает копии для фото,"
+        " которое заменили во время обработки."
+    )
+
+
+def test_backfill_keeps_shared_variants(
+        photo_post, post_with_another_category
+):
+    from django.core.files.base import ContentFile
+
+    from blog.models import Post
+
+    storage = photo_post.image.storage
+    shared = storage.save(
+        "post_images/variants/shared-320w.jpg", ContentFile(b"variant")
+    )
+    own = storage.save(
+        "post_images/variants/own-640w.jpg", ContentFile(b"own variant")
+    )
+    Post.objects.filter(pk=post_with_another_category.pk).update(
+        image=photo_post.image.name,
+        image_variants={
+            "source": photo_post.image.name,
+            "variants": [{"name": shared, "width": 320}],
+        },
+    )
+    Post.objects.filter(pk=photo_post.pk).update(image_variants={
+        "source": "post_images/old-source.jpg",
+        "variants": [
+            {"name": shared, "width": 320}, {"name": own, "width": 640},
+        ],
+    })
+    call_command("make_image_variants")
+    assert storage.exists(shared), (
+        "Убедитесь, что make_image_variants не удаляет старые копии, на"
+        " которые ссылаются другие публикации."
+    )
+    assert not storage.exists(own)
@@ -0,0 +1,182 @@
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db, pytest.mark.usefixtures("media_root")]
+
+
+@pytest.fixture
+def photo_with_exif(make_photo):
+    def make(color="teal"):
+        exif = Image.Exif()
+        exif[0x0110] = "Secret Camera"  # Model
+        exif[0x0112] = 6  # Orientation: повернуть на 90°
+        return make_photo(color, size=(800, 400), exif=exif)
+
+    return make
+
+
+@pytest.fixture
+def queued_post(post_with_published_location, photo_with_exif):
+    from blog.models import Job
+
+    post = post_with_published_location
+    Job.objects.all().delete()
+    post.image = photo_with_exif()
+    post.save()
+    return post
+
+
+def _jobs():
+    from blog.models import Job
+
+    return list(Job.objects.order_by("pk"))
+
+
+def test_upload_is_queued(queued_post):
+    assert queued_post.image_variants == {}, (
+        "Убедитесь, что уменьшенные копии фото создаются не во время"
+        " запроса, а фоновой задачей."
+    )
+    queued_post.title = "Новый заголовок"
+    queued_post.save()
+    jobs = _jobs()
+    assert len(jobs) == 1 and jobs[0].kind == "post_image", (
+        "Убедитесь, что обработка фото ставится в очередь один раз."
+    )
+
+
+def test_job_strips_exif_and_makes_variants(queued_post):
+    from blog.models import Job
+
+    uploaded = queued_post.image.name
+    updated_at = queued_post.updated_at
+    call_command("run_jobs", once=True, processes=0)
+    assert _jobs()[0].status == Job.DONE
+    queued_post.refresh_from_db()
+    assert queued_post.image_variants["source"] == queued_post.image.name
+    assert queued_post.image.name != uploaded
+    assert queued_post.updated_at > updated_at
+    with queued_post.image.open("rb") as file:
+        picture = Image.open(file)
+        assert not picture.getexif(), (
+            "Убедитесь, что из фото публикации удаляются данные EXIF."
+        )
+        assert picture.size == (400, 800), (
+            "Убедитесь, что фото поворачивается по метке ориентации."
+        )
+
+    variants = queued_post.image_variants
+    Job.objects.update(status=Job.PENDING)
+    call_command("run_jobs", once=True, processes=0)
+    queued_post.refresh_from_db()
+    assert queued_post.image_variants == variants, (
+        "Убедитесь, что повторное выполнение задачи ничего не меняет."
+    )
+
+
+def test_replaced_image_is_skipped(queued_post, photo_with_exif):
+    from blog.jobs import process_post_image
+
+    stale = queued_post.image.name
+    queued_post.image = photo_with_exif("red")
+    queued_post.save()
+    process_post_image(queued_post.pk, stale)
+    queued_post.refresh_from_db()
+    assert queued_post.image_variants == {}
+    call_command("run_jobs", once=True, processes=0)
+    queued_post.refresh_from_db()
+    assert queued_post.image_variants["source"] == queued_post.image.name
+
+
+def test_failed_job_is_retried(queued_post, monkeypatch):
+    from blog import jobs
+    from blog.models import Job
+
+    def broken(**payload):
+        raise OSError("Хранилище недоступно")
+
+    monkeypatch.setitem(jobs.HANDLERS, "post_image", broken)
+    call_command("run_jobs", once=True, processes=0)
+    job = _jobs()[0]
+    assert job.status == Job.PENDING and job.attempts == 1, (
+        "Убедитесь, что неудачная задача ставится в очередь повторно."
+    )
+    assert job.run_after > timezone.now()
+    assert "Хранилище недоступно" in job.error
+
+    for _ in range(jobs.MAX_ATTEMPTS):
+        Job.objects.update(run_after=timezone.now())
+        call_command("run_jobs", once=True, processes=0)
+    job = _jobs()[0]
+    assert job.status == Job.FAILED and job.attempts == jobs.MAX_ATTEMPTS
+
+
+def test_job_is_claimed_once(queued_post):
+    from blog.jobs import claim_jobs
+
+    assert len(claim_jobs(limit=10)) == 1
+    assert claim_jobs(limit=10) == [], (
+        "Убедитесь, что захваченную задачу не может забрать другой"
+        " воркер."
+    )
+
+
+def test_crashing_job_is_not_reclaimed_forever(queued_post):
+    from blog.jobs import MAX_ATTEMPTS, claim_jobs
+    from blog.models import Job
+
+    for _ in range(MAX_ATTEMPTS):
+        assert len(claim_jobs(limit=10)) == 1
+        # Воркер упал, не отметив результат: блокировка истекла.
+        Job.objects.update(locked_until=timezone.now())
+    assert claim_jobs(limit=10) == []
+    job = _jobs()[0]
+    assert job.status == Job.FAILED and job.attempts == MAX_ATTEMPTS, (
+        "Убедитесь, что задача, которая роняет воркер, после MAX_ATTEMPTS"
+        " попыток отмечается ошибкой, а не захватывается снова."
+    )
+
+
+def test_stale_save_keeps_processed_image(queued_post):
+    from blog.models import Post
+
+    stale = Post.objects.get(pk=queued_post.pk)
+    call_command("run_jobs", once=True, processes=0)
+    processed = Post.objects.get(pk=queued_post.pk)
+    stale.title = "Правка из старой формы"
+    stale.save()
+    call_command("run_jobs", once=True, processes=0)
+    post = Post.objects.get(pk=queued_post.pk)
+    assert post.title == "Правка из старой формы"
+    assert (post.image.name, post.image_variants) == (
+        processed.image.name, processed.image_variants
+    ), (
+        "Убедитесь, что сохранение публикации, загруженной до окончания"
+        " обработки фото, не возвращает необработанный оригинал."
+    )
+    with post.image.open("rb") as file:
+        assert not Image.open(file).getexif()
+
+
+def test_finished_job_is_requeued(queued_post, photo_with_exif):
+    from blog.models import Job
+
+    original = queued_post.image.name
+    call_command("run_jobs", once=True, processes=0)
+    queued_post.image = photo_with_exif("red")
+    queued_post.save()
+    call_command("run_jobs", once=True, processes=0)
+    queued_post.image = photo_with_exif()
+    queued_post.save()
+    assert queued_post.image.name == original
+    assert Job.objects.get(
+        key=f"post-image:{queued_post.pk}:{original}"
+    ).status == Job.PENDING, (
+        "Убедитесь, что завершённая задача ставится заново, если то же"
+        " фото загружено снова."
+    )
+    call_command("run_jobs", once=True, processes=0)
+    queued_post.refresh_from_db()
+    assert queued_post.image_variants["source"] == queued_post.image.name
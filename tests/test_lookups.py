@@ -0,0 +1,141 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+from conftest import get_feed_urls
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _lookup_queries(captured_queries):
+    return [
+        query["sql"] for query in captured_queries
+        if 'FROM "blog_category"' in query["sql"]
+        or 'FROM "blog_location"' in query["sql"]
+        or 'JOIN "blog_category"' in query["sql"]
+        or 'JOIN "blog_location"' in query["sql"]
+    ]
+
+
+def test_pages_use_lookup_cache(user_client, feed_post):
+    urls = (
+        *get_feed_urls(feed_post.category, feed_post.author),
+        f"/posts/{feed_post.id}/",
+    )
+    for url in urls:
+        user_client.get(url)
+    feed_post.save()
+    for url in urls:
+        with CaptureQueriesContext(connection) as ctx:
+            content = user_client.get(url).content.decode("utf-8")
+        assert feed_post.category.title in content
+        assert feed_post.location.name in content
+        assert not _lookup_queries(ctx.captured_queries), (
+            f"Убедитесь, что страница `{url}` берёт категории и"
+            " местоположения из кеша процесса."
+        )
+
+
+def test_lookup_cache_follows_shared_version(feed_post):
+    from blog.cache import GLOBAL_SCOPE, LOOKUPS_SCOPE, bump_versions
+    from blog.lookups import categories
+    from blog.models import Category
+
+    category = feed_post.category
+    assert categories.get_by("slug", category.slug).title == category.title
+    Category.objects.filter(pk=category.pk).update(title="Новое название")
+    bump_versions(GLOBAL_SCOPE)
+    assert categories.get(category.pk).title == category.title, (
+        "Убедитесь, что кеш категорий не перечитывается при изменениях,"
+        " которые справочников не касаются."
+    )
+    bump_versions(LOOKUPS_SCOPE)
+    assert categories.get(category.pk).title == "Новое название", (
+        "Убедитесь, что кеш категорий перечитывается при смене версии"
+        " справочников, которую меняют другие процессы."
+    )
+
+
+def test_lookup_cache_expires(settings, feed_post):
+    from blog.lookups import categories
+    from blog.models import Category
+
+    category = feed_post.category
+    settings.BLOG_LOOKUP_TIMEOUT = 0
+    categories.get(category.pk)
+    Category.objects.filter(pk=category.pk).update(title="Новое название")
+    assert categories.get(category.pk).title == "Новое название", (
+        "Убедитесь, что копия справочника в памяти процесса живёт не"
+        " дольше BLOG_LOOKUP_TIMEOUT секунд."
+    )
+
+
+def test_post_form_choices_from_cache(
+        user_client, published_category, published_location
+):
+    from blog.forms import PostForm
+
+    form = PostForm(initial={"location": published_location.pk})
+    str(form["category"]) + str(form["location"])
+    with CaptureQueriesContext(connection) as ctx:
+        html = str(form["category"]) + str(form["location"])
+    assert published_category.title in html
+    assert published_location.name in html, (
+        "Убедитесь, что в поле местоположения выводится выбранный"
+        " вариант."
+    )
+    assert not _lookup_queries(ctx.captured_queries), (
+        "Убедитесь, что варианты категорий и местоположений в форме"
+        " публикации берутся из кеша процесса."
+    )
+
+    form = PostForm(data={
+        "title": "Заголовок", "text": "Текст",
+        "pub_date": timezone.now().strftime("%Y-%m-%dT%H:%M"),
+        "category": published_category.pk,
+        "location": published_location.pk,
+    })
+    assert form.is_valid(), form.errors
+    assert form.cleaned_data["category"].pk == published_category.pk
+    assert not PostForm(data={"category": 10 ** 6}).is_valid()
+
+
+def test_location_select_is_bounded(mixer: Mixer):
+    from blog.forms import PostForm
+
+    locations = mixer.cycle(30).blend("blog.Location")
+    html = str(PostForm()["location"])
+    assert html.count("<option") == 1, (
+        "Убедитесь, что список местоположений в форме публикации не"
+        " выводит все местоположения сразу."
+    )
+    html = str(PostForm(initial={"location": locations[3].pk})["location"])
+    assert html.count("<option") == 2 and locations[3].name in html
+
+
+def test_location_autocomplete(mixer: Mixer, client):
+    from blog.forms import AUTOCOMPLETE_LIMIT
+
+    mixer.cycle(AUTOCOMPLETE_LIMIT + 5).blend(
+        "blog.Location", name=(f"Москва {i:02}" for i in range(99))
+    )
+    mixer.blend("blog.Location", name="Мурманск")
+    mixer.blend("blog.Location", name="Самара")
+
+    def names(query):
+        response = client.get("/locations/autocomplete/", {"q": query})
+        assert response.status_code == 200
+        return [item["name"] for item in response.json()["results"]]
+
+    assert names("мур") == ["Мурманск"], (
+        "Убедитесь, что автодополнение ищет местоположения по началу"
+        " названия без учёта регистра."
+    )
+    found = names("Моск")
+    assert found == sorted(found) and len(found) == AUTOCOMPLETE_LIMIT, (
+        "Убедитесь, что автодополнение возвращает ограниченное число"
+        " местоположений по алфавиту."
+    )
+    assert names("") == [] and names("Я") == []
@@ -0,0 +1,138 @@
+import hashlib
+from http import HTTPStatus
+
+import pytest
+
+pytestmark = [pytest.mark.usefixtures("media_root")]
+
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def legacy_file(media_root):
+    path = media_root / "post_images" / "legacy.jpg"
+    path.parent.mkdir()
+    path.write_bytes(CONTENT)
+    return "/media/post_images/legacy.jpg"
+
+
+@pytest.fixture
+def hashed_file(media_root):
+    digest = hashlib.sha256(CONTENT).hexdigest()
+    path = media_root / "post_images" / digest[:2] / digest[2:4]
+    path.mkdir(parents=True)
+    (path / f"{digest}.jpg").write_bytes(CONTENT)
+    url = f"/media/post_images/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+    return url, digest
+
+
+def _body(response):
+    return b"".join(response.streaming_content)
+
+
+def test_full_file(client, legacy_file):
+    response = client.get(legacy_file)
+    assert response.status_code == HTTPStatus.OK
+    assert _body(response) == CONTENT
+    assert response["Content-Type"] == "image/jpeg"
+    assert response["Accept-Ranges"] == "bytes"
+    assert response["ETag"].startswith('"')
+    assert "immutable" not in response["Cache-Control"]
+
+
+@pytest.mark.parametrize(
+    "header, start, end",
+    [
+        ("bytes=0-9", 0, 9),
+        ("bytes=1000-", 1000, 1023),
+        ("bytes=-24", 1000, 1023),
+        ("bytes=1020-5000", 1020, 1023),
+    ],
+)
+def test_range(client, legacy_file, header, start, end):
+    response = client.get(legacy_file, HTTP_RANGE=header)
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT, (
+        "Убедитесь, что медиафайлы отдаются по частям для запросов Range."
+    )
+    assert _body(response) == CONTENT[start:end + 1]
+    assert response["Content-Range"] == f"bytes {start}-{end}/1024"
+    assert response["Content-Length"] == str(end - start + 1)
+
+
+def test_unsatisfiable_range(client, legacy_file):
+    response = client.get(legacy_file, HTTP_RANGE="bytes=2000-")
+    assert response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response["Content-Range"] == "bytes */1024"
+
+
+def test_stale_if_range_gets_full_file(client, legacy_file):
+    response = client.get(
+        legacy_file, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"other"'
+    )
+    assert response.status_code == HTTPStatus.OK
+    etag = response["ETag"]
+    response = client.get(
+        legacy_file, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag
+    )
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT
+
+
+def test_hashed_file_is_immutable(client, hashed_file):
+    url, digest = hashed_file
+    response = client.get(url)
+    assert response["ETag"] == f'"{digest}"', (
+        "Убедитесь, что ETag файла с именем по хешу — это хеш содержимого."
+    )
+    assert "immutable" in response["Cache-Control"]
+    assert "max-age=31536000" in response["Cache-Control"]
+    response = client.get(url, HTTP_IF_NONE_MATCH=f'"{digest}"')
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_head(client, legacy_file):
+    response = client.head(legacy_file)
+    assert response.status_code == HTTPStatus.OK
+    assert response["Content-Length"] == "1024"
+    assert response.content == b""
+
+
+@pytest.mark.parametrize(
+    "mode, header, value",
+    [
+        (
+            "x-accel-redirect", "X-Accel-Redirect",
+            "/protected-media/post_images/legacy.jpg",
+        ),
+        ("x-sendfile", "X-Sendfile", "post_images/legacy.jpg"),
+    ],
+)
+def test_sendfile(client, settings, legacy_file, mode, header, value):
+    settings.BLOG_MEDIA_SENDFILE = mode
+    response = client.get(legacy_file)
+    assert response.status_code == HTTPStatus.OK
+    assert response[header].endswith(value), (
+        "Убедитесь, что в режиме BLOG_MEDIA_SENDFILE файл отдаёт прокси."
+    )
+    assert response.content == b""
+    assert response["ETag"]
+
+
+def test_missing_and_traversal(client, legacy_file):
+    assert client.get("/media/post_images/missing.jpg").status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+    assert client.get("/media/post_images/../../settings.py").status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+    assert client.get("/media/post_images/").status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+
+
+@pytest.mark.django_db
+def test_media_route_is_not_catch_all(client, post_with_published_location):
+    response = client.get(f"/posts/{post_with_published_location.pk}")
+    assert response.status_code == HTTPStatus.MOVED_PERMANENTLY, (
+        "Убедитесь, что маршрут медиафайлов не перехватывает адреса без"
+        " завершающей косой черты."
+    )
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def scheduled_post(mixer: Mixer, user, published_category):
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    return mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        title="Отложенная публикация",
+        pub_date=timezone.now() + timedelta(seconds=30),
+    )
+
+
+def test_cutoff_is_stable_until_next_publication(scheduled_post):
+    from blog.cache import publication_cutoff, schedule_timeout
+
+    assert publication_cutoff() == publication_cutoff(), (
+        "Убедитесь, что граница выборки опубликованных публикаций не"
+        " меняется между запросами до ближайшей отложенной публикации."
+    )
+    assert schedule_timeout(3600) <= 30, (
+        "Убедитесь, что кеш лент живёт не дольше, чем до ближайшей"
+        " отложенной публикации."
+    )
+
+
+def test_scheduled_post_appears_on_time(
+        unlogged_client, scheduled_post, monkeypatch
+):
+    from blog import cache
+
+    for _ in range(2):
+        response = unlogged_client.get("/")
+        assert scheduled_post.title not in response.content.decode("utf-8")
+    assert response["X-Page-Cache"] == "hit"
+
+    later = scheduled_post.pub_date + timedelta(seconds=1)
+    monkeypatch.setattr(cache.timezone, "now", lambda: later)
+    response = unlogged_client.get("/")
+    assert scheduled_post.title in response.content.decode("utf-8"), (
+        "Убедитесь, что отложенная публикация появляется в ленте в"
+        " назначенное время, несмотря на кеш."
+    )
+
+
+def test_scheduler_publishes_and_warms(
+        unlogged_client, scheduled_post, monkeypatch
+):
+    from django.core.management import call_command
+    from django.utils import timezone as django_timezone
+
+    call_command("run_scheduler", once=True)
+    later = scheduled_post.pub_date + timedelta(seconds=1)
+    monkeypatch.setattr(django_timezone, "now", lambda: later)
+    call_command("run_scheduler", once=True)
+
+    for url in (
+        "/",
+        f"/category/{scheduled_post.category.slug}/",
+        f"/profile/{scheduled_post.author.username}/",
+    ):
+        response = unlogged_client.get(url)
+        assert response["X-Page-Cache"] == "hit", (
+            f"Убедитесь, что планировщик заранее рендерит страницу `{url}`"
+            " при наступлении времени отложенной публикации."
+        )
+        assert scheduled_post.title in response.content.decode("utf-8")
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def searchable_posts(mixer: Mixer, user, published_category):
+    past = timezone.now() - timedelta(days=1)
+    return {
+        "title": mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            pub_date=past, title="Кометы над Байкалом", text="Ночное небо.",
+        ),
+        "text": mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            pub_date=past, title="Заметки",
+            text="Видели комету <script>alert(1)</script> рано утром.",
+        ),
+        "hidden": mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            pub_date=past, is_published=False, title="Кометы и черновики",
+        ),
+        "future": mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            pub_date=timezone.now() + timedelta(days=1),
+            title="Кометы будущего",
+        ),
+    }
+
+
+def _found(client, query):
+    response = client.get("/search/", {"q": query})
+    assert response.status_code == 200, (
+        "Убедитесь, что страница поиска загружается без ошибок."
+    )
+    return response, [post.pk for post in response.context["object_list"]]
+
+
+def test_search_finds_published_posts(unlogged_client, searchable_posts):
+    response, found = _found(unlogged_client, "комет")
+    assert set(found) == {
+        searchable_posts["title"].pk, searchable_posts["text"].pk
+    }, (
+        "Убедитесь, что поиск находит совпадения в заголовке и тексте и не"
+        " показывает снятые с публикации и отложенные публикации."
+    )
+    content = response.content.decode("utf-8")
+    assert "<mark>" in content, (
+        "Убедитесь, что совпадения в результатах поиска подсвечиваются."
+    )
+    assert "<script>alert(1)</script>" not in content, (
+        "Убедитесь, что текст публикаций в результатах поиска экранируется."
+    )
+
+
+def test_search_index_follows_changes(unlogged_client, searchable_posts):
+    post = searchable_posts["title"]
+    post.title = "Метеоры"
+    post.save()
+    _, found = _found(unlogged_client, "метеоры")
+    assert found == [post.pk], (
+        "Убедитесь, что поисковый индекс обновляется при изменении"
+        " публикации."
+    )
+    post.delete()
+    assert _found(unlogged_client, "метеоры")[1] == []
+
+    call_command("rebuild_search_index")
+    assert _found(unlogged_client, "комету")[1] == [
+        searchable_posts["text"].pk
+    ]
+
+
+def test_search_query_syntax_is_safe(unlogged_client, searchable_posts):
+    for query in ('"', "комет OR", "NEAR(", "*", ""):
+        _found(unlogged_client, query)
+    assert unlogged_client.get(
+        "/search/", {"q": "комет", "page": 1000}
+    ).status_code == 404
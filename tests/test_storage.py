@@ -0,0 +1,91 @@
+import re
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+pytestmark = [pytest.mark.django_db, pytest.mark.usefixtures("media_root")]
+
+ADDRESSED_RE = re.compile(
+    r"^post_images/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.\w+$"
+)
+
+
+def _upload(post, photo):
+    post.image = photo
+    post.save()
+    post.refresh_from_db()
+    return post.image.name
+
+
+def test_upload_named_by_content_hash(
+        post_with_published_location, make_photo
+):
+    name = _upload(
+        post_with_published_location, make_photo(name="Photo.JPG")
+    )
+    assert ADDRESSED_RE.match(name), (
+        "Убедитесь, что фото публикации сохраняется под хешем содержимого"
+        " в двухуровневом дереве каталогов post_images/ab/cd/."
+    )
+
+
+def test_identical_uploads_are_deduplicated(
+        post_with_published_location, post_with_another_category, make_photo
+):
+    first = _upload(post_with_published_location, make_photo())
+    second = _upload(post_with_another_category, make_photo())
+    assert first == second, (
+        "Убедитесь, что одинаковые фото сохраняются в один файл."
+    )
+    assert _upload(post_with_another_category, make_photo("red")) != first
+
+
+def test_migrate_image_storage(
+        post_with_published_location, make_photo, capsys
+):
+    from blog.models import Job, Post
+
+    post = post_with_published_location
+    storage = Post._meta.get_field("image").storage
+    old_name = "post_images/legacy-photo.jpg"
+    storage.delete(old_name)
+    with storage.open(old_name, "wb") as file:
+        file.write(make_photo().read())
+    old_path = storage.path(old_name)
+    variant_name = super(type(storage), storage).save(
+        "post_images/variants/legacy-photo-320w.jpg",
+        ContentFile(make_photo("red").read()),
+    )
+    Post.objects.filter(pk=post.pk).update(
+        image=old_name,
+        image_variants={
+            "source": "post_images/old-source.jpg",
+            "variants": [{"name": variant_name, "width": 320}],
+        },
+    )
+
+    call_command("migrate_image_storage", batch_size=1)
+    assert "Перенесено фото: 1" in capsys.readouterr().out
+    post.refresh_from_db()
+    assert ADDRESSED_RE.match(post.image.name), (
+        "Убедитесь, что команда migrate_image_storage переносит фото в"
+        " новое расположение и переписывает ссылку на него."
+    )
+    assert storage.exists(post.image.name)
+    assert not storage.exists(old_name), (
+        "Убедитесь, что после переноса старый файл удаляется."
+    )
+    assert not storage.exists(old_path)
+    new_variant = post.image_variants["variants"][0]["name"]
+    assert ADDRESSED_RE.match(new_variant)
+    assert not storage.exists(variant_name)
+    assert Job.objects.filter(
+        key=f"post-image:{post.pk}:{post.image.name}"
+    ).exists(), (
+        "Убедитесь, что для необработанного фото ставится задача с"
+        " новым именем файла."
+    )
+
+    call_command("migrate_image_storage")
+    assert "Перенесено фото: 0" in capsys.readouterr().out
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def posts(mixer: Mixer, user, published_category):
+    return mixer.cycle(3).blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+
+
+def _visible(posts):
+    from blog.models import Post
+
+    return set(
+        Post.objects.filter(pk__in=[post.pk for post in posts])
+        .values_list("is_visible", flat=True)
+    )
+
+
+def test_category_toggle_updates_posts(posts, published_category):
+    assert _visible(posts) == {True}
+
+    published_category.is_published = False
+    with CaptureQueriesContext(connection) as ctx:
+        published_category.save()
+    updates = [
+        query["sql"] for query in ctx.captured_queries
+        if query["sql"].startswith('UPDATE "blog_post"')
+    ]
+    assert len(updates) == 1 and _visible(posts) == {False}, (
+        "Убедитесь, что при снятии категории с публикации видимость её"
+        " публикаций обновляется одним запросом UPDATE."
+    )
+
+    posts[0].is_published = False
+    posts[0].save()
+    published_category.is_published = True
+    published_category.save()
+    assert not _visible(posts[:1]).pop() and _visible(posts[1:]) == {True}
+
+
+def test_feed_filter_does_not_use_category(unlogged_client, posts):
+    with CaptureQueriesContext(connection) as ctx:
+        unlogged_client.get("/")
+    assert not [
+        query["sql"] for query in ctx.captured_queries
+        if '"blog_category"."is_published"'
+        in query["sql"].partition(" WHERE ")[2]
+    ], (
+        "Убедитесь, что лента проверяет видимость публикаций по полю"
+        " is_visible, без условия на категорию."
+    )
+
+
+def test_check_visibility(posts, capsys):
+    from blog.models import Post
+
+    Post.objects.filter(pk=posts[0].pk).update(is_visible=False)
+    call_command("check_visibility", batch_size=2)
+    assert "расхождений: 1." in capsys.readouterr().out
+    assert _visible(posts[:1]) == {False}
+
+    call_command("check_visibility", fix=True)
+    assert _visible(posts) == {True}, (
+        "Убедитесь, что команда check_visibility --fix исправляет"
+        " расхождения is_visible."
+    )
+
+
+def test_check_visibility_fix_resets_caches(posts, unlogged_client):
+    from blog.models import Post
+
+    hidden = posts[0]
+    Post.objects.filter(pk=hidden.pk).update(is_visible=False)
+    link = f"/posts/{hidden.pk}/"
+    for _ in range(2):
+        assert link not in unlogged_client.get("/").content.decode("utf-8")
+    call_command("check_visibility", fix=True)
+    assert link in unlogged_client.get("/").content.decode("utf-8"), (
+        "Убедитесь, что check_visibility --fix сбрасывает кеш лент с"
+        " исправленными публикациями."
+    )
+    assert unlogged_client.get(link).status_code == 200